@@ -1,11 +1,26 @@
 from __future__ import print_function
+import io
+import re
+import fnmatch
+import numbers
+import operator
+import os
+import gzip
+import asyncio
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
 from pprint import pprint
 import pandas as pd
 import json
+import time
+import uuid
 from datetime import datetime
 from treelib import Tree
-import pygraphviz as pgv
 
 ### Credits ###
 """
@@ -43,10 +58,745 @@ def change_host(new_host):
 def view_host():
     print(host)
 
+
+########################################## HTTP Client ##################################################
+
+# APIClient - wraps a requests.Session that keeps a pool of keep-alive connections open to a single host.
+# Every module function and every Project routes its calls through one of these, so repeated calls (and the 4+ calls behind
+# a single model edit) reuse the same TCP/TLS connections instead of opening a new one per request.
+class APIClient:
+
+    def __init__(self, host_name=None, pool_connections=4, pool_maxsize=16, timeout=(5, 60), compression=True, max_retries=0):
+        self.host = (host_name or host).rstrip("/")
+        self.timeout = timeout # (connect, read) seconds, passed to every request unless overridden
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.session.headers["Accept"] = "application/json"
+        # Element payloads are large, highly repetitive JSON; letting the server gzip them cuts transfer time considerably
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if compression else "identity"
+
+        # Number of requests sent, keyed by (method, endpoint), e.g. ("GET", "elements"). Useful to check how many round-trips an operation costs.
+        self.request_counts = Counter()
+
+    # Builds the full url for a path relative to the host, e.g. "projects/{id}/commits". Full urls (e.g. pagination links) are used as they are.
+    def url(self, path):
+        return _url(self.host, path)
+
+    def get(self, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        self._count("GET", path)
+        return self.session.get(self.url(path), **kwargs)
+
+    # Posts the body (dict) as JSON
+    def post(self, path, body=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        self._count("POST", path)
+        return self.session.post(self.url(path),
+                                 headers={"Content-Type": "application/json"},
+                                 data=json.dumps(body),
+                                 **kwargs)
+
+    def _count(self, method, path):
+        self.request_counts[(method, _endpoint(path))] += 1
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _url(host_name, path):
+    if path.startswith(("http://", "https://")):
+        return path
+    return f"{host_name}/{path.lstrip('/')}"
+
+# The endpoint of a path is its last segment without the query string: "projects", "commits", "elements", ...
+# or, for a single item, the segment before its id: "elements/{id}"
+def _endpoint(path):
+    segments = path.split("?", 1)[0].rstrip("/").rsplit("/", 2)
+    try:
+        uuid.UUID(segments[-1])
+    except ValueError:
+        return segments[-1]
+    return f"{segments[-2]}/{{id}}" if len(segments) > 1 else "{id}"
+
+
+# One shared client per host, created on first use. Use configure_client() to change the pool size, timeouts, or compression.
+_clients = {}
+_clients_lock = threading.Lock()
+_client_options = {}
+
+# Get Client - returns the shared APIClient for the given host (defaults to the current host)
+def get_client(host_name=None):
+    key = (host_name or host).rstrip("/")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = APIClient(key, **_client_options)
+            _clients[key] = client
+    return client
+
+# Configure Client - sets the options (pool_connections, pool_maxsize, timeout, compression, max_retries) used for the shared clients.
+# Existing shared clients are closed and recreated with the new options on their next use.
+def configure_client(**options):
+    with _clients_lock:
+        _client_options.update(options)
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+########################################## Element Cache ##################################################
+
+# ElementCache - persistent on-disk cache of the elements of commits, keyed by (host, project id, commit id).
+# Commits in the SysML v2 API are immutable, so once a commit's elements have been downloaded they can be read back locally forever.
+# Each entry is a gzip-compressed JSON Lines file holding one page of elements per line, so entries are written and read page by page.
+# When the total size of the entries goes over max_bytes, the least recently used ones are deleted.
+class ElementCache:
+
+    def __init__(self, directory=None, max_bytes=512 * 1024 * 1024):
+        self.directory = directory or os.path.join(os.path.expanduser("~"), ".cache", "sysml_v2_api", "elements")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, host_name, project_id, commit_id):
+        key = hashlib.sha1(f"{host_name.rstrip('/')}|{project_id}|{commit_id}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.jsonl.gz")
+
+    def contains(self, host_name, project_id, commit_id):
+        return os.path.exists(self._path(host_name, project_id, commit_id))
+
+    # Returns an iterator over the cached pages of the commit, or None if the commit is not cached
+    def read(self, host_name, project_id, commit_id):
+        path = self._path(host_name, project_id, commit_id)
+        try:
+            file = gzip.open(path, "rt", encoding="utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        os.utime(path) # the modification time doubles as the last use time for the LRU eviction
+        return self._read_pages(file)
+
+    def _read_pages(self, file):
+        with file:
+            for line in file:
+                yield json.loads(line)
+
+    # Wraps an iterator of pages: every page is passed through unchanged and appended to the commit's cache entry,
+    # which is only saved once the last page has gone through (an interrupted download is never cached).
+    def write(self, host_name, project_id, commit_id, batches):
+        entry = self.open_entry(host_name, project_id, commit_id)
+        try:
+            for batch in batches:
+                entry.add(batch)
+                yield batch
+        except BaseException:
+            entry.abort()
+            raise
+        else:
+            entry.save()
+        finally:
+            entry.abort() # no-op once saved; also covers a consumer that stops early
+
+    # Starts writing the cache entry of a commit page by page: add() each page, then save() (or abort()) it
+    def open_entry(self, host_name, project_id, commit_id):
+        return _CacheEntry(self, self._path(host_name, project_id, commit_id))
+
+    # Deletes the least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(".jsonl.gz"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, file_name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+
+    def clear(self):
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(".jsonl.gz"):
+                os.remove(os.path.join(self.directory, file_name))
+
+
+# A cache entry being written: pages go to a temporary file, which replaces the entry on save()
+class _CacheEntry:
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        fd, self.temp_path = tempfile.mkstemp(dir=cache.directory, suffix=".tmp")
+        self._raw_file = os.fdopen(fd, "wb")
+        self.file = gzip.open(self._raw_file, "wt", encoding="utf-8", compresslevel=5)
+
+    def add(self, batch):
+        self.file.write(json.dumps(batch))
+        self.file.write("\n")
+
+    def save(self):
+        if self.file is None:
+            return
+        self._close()
+        os.replace(self.temp_path, self.path)
+        self.cache.evict()
+
+    def abort(self):
+        if self.file is None:
+            return
+        self._close()
+        os.remove(self.temp_path)
+
+    def _close(self):
+        with self._raw_file: # the gzip stream does not close the file object it writes to
+            self.file.close()
+        self.file = None
+
+
+# The element cache used by iter_elements() (and so by every Project). None means element downloads are not cached.
+element_cache = None
+
+# Enable Element Cache - caches commit elements on disk, in the given directory (default ~/.cache/sysml_v2_api/elements) and up to max_bytes
+def enable_element_cache(directory=None, max_bytes=512 * 1024 * 1024):
+    global element_cache
+    element_cache = ElementCache(directory, max_bytes)
+    return element_cache
+
+# Disable Element Cache - elements are always downloaded from the server
+def disable_element_cache():
+    global element_cache
+    element_cache = None
+
+
+########################################## Elements Loader ##################################################
+
+# Number of elements requested per page from the elements endpoint
+ELEMENTS_PAGE_SIZE = 1000
+
+# The previous versions of the elements changed by a commit (to diff it with its previous commit, or to step back over it, see
+# Project._previous_records()) are requested element by element, in parallel, up to this many elements; beyond that, whole snapshots are compared
+DIFF_CHANGES_LIMIT = 200
+
+# Number of element requests sent at the same time for the previous versions of changed elements
+PREVIOUS_RECORDS_WORKERS = 8
+
+# Total number of elements of the commit snapshots kept in memory per project for history browsing (see CommitSnapshots)
+SNAPSHOT_BUDGET = 1000000
+
+# Commits are rebuilt from the nearest snapshot by applying at most this many commits' changes; further away, the commit is loaded whole
+MAX_DELTA_CHAIN = 100
+
+# Building a commit from far away (see Project._snapshot()) keeps a snapshot of every SNAPSHOT_INTERVAL-th commit on the way, to start from next time
+SNAPSHOT_INTERVAL = 10
+
+# Fill colors of the elements added or changed (renamed, re-owned, or modified) in tree images compared with another commit
+DIFF_COLORS = {"added": "palegreen", "changed": "khaki"}
+
+# Iterate Elements - yields the elements of a commit one page (list of element dicts) at a time.
+# It follows the API's Link header pagination (page[size] / page[after]), so only one page of raw JSON is in memory at a time
+# and callers can start consuming elements before the whole model has been downloaded.
+# Servers that ignore the paging parameters simply return everything as a single page.
+# Commits are immutable, so unless use_cache is False the pages are read from (or, on a miss, saved to) the element cache (see ElementCache).
+def iter_elements(project_id, commit_id, page_size=ELEMENTS_PAGE_SIZE, client=None, use_cache=True):
+    client = client or get_client()
+    cache = element_cache if use_cache else None
+
+    if cache is not None:
+        cached_batches = cache.read(client.host, project_id, commit_id)
+        if cached_batches is not None:
+            yield from cached_batches
+            return
+
+    batches = _download_elements(project_id, commit_id, page_size, client)
+    if cache is not None:
+        batches = cache.write(client.host, project_id, commit_id, batches)
+    yield from batches
+
+def _download_elements(project_id, commit_id, page_size, client):
+    path = f"projects/{project_id}/commits/{commit_id}/elements"
+    params = {"page[size]": page_size}
+
+    while path:
+        response = client.get(path, params=params)
+        if response.status_code != 200:
+            raise ValueError(f"Status Code: {response.status_code}. Problem in fetching elements of project {project_id}, commit {commit_id}.")
+
+        batch = response.json()
+        if batch:
+            yield batch
+
+        # the "next" link already carries the page[size] and page[after] parameters
+        path = response.links.get("next", {}).get("url")
+        params = None
+
+# Iterate Element Frames - same as iter_elements(), but yields each page as a DataFrame with the same columns as Project.all_elements
+def iter_element_frames(project_id, commit_id, page_size=ELEMENTS_PAGE_SIZE, client=None, use_cache=True):
+    for batch in iter_elements(project_id, commit_id, page_size=page_size, client=client, use_cache=use_cache):
+        yield pd.DataFrame([(element["name"], element["@id"], element["@type"], _owner_id(element)) for element in batch],
+                           columns=["name", "id", "type", "owner_id"], dtype=object)
+
+# Returns the commits (list of commit dicts from the API) as a DataFrame of Commit ID, Commit Created, and Previous Commit, from newest to oldest
+def _commits_dataframe(commits):
+    commits_data = list(map(lambda b: {'Commit ID':b['@id'], "Commit Created":b['created'], "Previous Commit":_previous_commit_id(b)}, commits))
+
+    df_commits = pd.DataFrame.from_records(commits_data, columns=['Commit ID', 'Commit Created', 'Previous Commit'])
+
+    df_commits['Commit Created'] = pd.to_datetime(df_commits['Commit Created'])  # Convert to datetime
+    df_commits = df_commits.sort_values(by='Commit Created', ascending=False)    # Sort from newest to oldest
+
+    # Reset the index if desired
+    return df_commits.reset_index(drop=True)
+
+# Fields of an element that the API scripts read (see _element_record()); everything else in an element is never used
+ELEMENT_FIELDS = ["@id", "@type", "name", "ownedElement", "text"]
+
+# Hosts that answered that they do not support the query endpoint: later queries go straight to client-side filtering
+_query_unsupported_hosts = set()
+
+# Query Elements - returns the elements (list of element dicts) of a commit having one of the given types (a type or a list of types; every element if None),
+# with only the given fields. The query is pushed down to the server (POST projects/{id}/query-results with a where-clause on @type and a select list),
+# so only the matching elements and fields are transferred, e.g. query_elements(project.id, commit_id, "RequirementUsage") for the requirements view of a
+# commit that is not loaded (see Project.requirements_table()).
+# If the server does not support the query, the elements are loaded with iter_elements() instead (from the element cache when possible) and filtered here.
+# Set pushdown to False to always filter here.
+def query_elements(project_id, commit_id, type=None, fields=ELEMENT_FIELDS, client=None, pushdown=True, use_cache=True):
+    client = client or get_client()
+    types = None if type is None else [type] if isinstance(type, str) else list(type)
+
+    elements = None
+    if pushdown and client.host not in _query_unsupported_hosts:
+        elements = _server_query(project_id, commit_id, types, fields, client)
+    if elements is None:
+        elements = (element for batch in iter_elements(project_id, commit_id, client=client, use_cache=use_cache) for element in batch)
+
+    # also checked here, since a server may only apply part of the query (e.g. return every field)
+    return [{field: element[field] for field in fields if field in element}
+            for element in elements if types is None or element.get("@type") in types]
+
+# Runs the query on the server; returns the matching elements, or None if the server cannot run it
+def _server_query(project_id, commit_id, types, fields, client):
+    query = {"@type": "Query", "select": list(fields)}
+    if types:
+        constraints = [{"@type": "PrimitiveConstraint", "inverse": False, "operator": "=", "property": "@type", "value": type} for type in types]
+        query["where"] = constraints[0] if len(constraints) == 1 else {"@type": "CompositeConstraint", "operator": "or", "constraint": constraints}
+
+    response = client.post(f"projects/{project_id}/query-results?commitId={commit_id}", query)
+    if _query_unsupported(response): # the host cannot run queries at all: later queries are filtered here directly
+        _query_unsupported_hosts.add(client.host)
+        return None
+    if response.status_code != 200: # any other error (e.g. a 400 for this query only): filter here this time
+        return None
+
+    elements = response.json()
+    next_url = response.links.get("next", {}).get("url")
+    while next_url: # results may be paginated like the elements endpoint
+        response = client.get(next_url)
+        if response.status_code != 200:
+            return None
+        elements.extend(response.json())
+        next_url = response.links.get("next", {}).get("url")
+    return elements
+
+# Whether a response to a query says that the server has no query endpoint: 404, 405, or 501, or a 400 whose message says so.
+# Other errors may come from the query itself, so they do not turn pushdown off for the host.
+def _query_unsupported(response):
+    if response.status_code in (404, 405, 501):
+        return True
+    return response.status_code == 400 and re.search(r"not (?:yet )?(?:supported|implemented)|unsupported", response.text, re.IGNORECASE) is not None
+
+def _previous_commit_id(commit):
+    return (commit.get("previousCommit") or {}).get("@id")
+
+# Get Commit Element - returns the element (dict) with the given id as it is in the given commit, or None if it does not exist there
+def commit_element(project_id, commit_id, element_id, client=None):
+    client = client or get_client()
+    response = client.get(f"projects/{project_id}/commits/{commit_id}/elements/{element_id}")
+
+    if response.status_code == 200:
+        return response.json()
+    elif response.status_code == 404:
+        return None
+    else:
+        raise ValueError(f"Status Code: {response.status_code}. Problem in fetching element {element_id} of commit {commit_id}.")
+
+# Get Commit Changes - returns the changes (list of DataVersions, with payload None for deleted elements) made by a commit
+def commit_changes(project_id, commit_id, client=None):
+    client = client or get_client()
+    response = client.get(f"projects/{project_id}/commits/{commit_id}/changes")
+
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise ValueError(f"Status Code: {response.status_code}. Problem in fetching changes of commit {commit_id}.")
+
+# Reduces an element (dict from the API) to the fields a Project keeps
+def _element_record(element, element_id=None):
+    return {"name": element.get("name"),
+            "id": element_id or element["@id"],
+            "type": element["@type"],
+            "owner_id": _owner_id(element),
+            "desc": element.get("text")}
+
+# Requirements table (name, desc, id, type, owner_id) of element records; dtype=object keeps missing owners as None
+def _requirements_frame(records):
+    return pd.DataFrame([(record["name"], record["desc"], record["id"], record["type"], record["owner_id"]) for record in records],
+                        columns=["name", "desc", "id", "type", "owner_id"], dtype=object)
+
+# Returns the @id of the element changed by a DataVersion, or None if it is a new element whose @id the server has not assigned yet
+def _change_id(change):
+    identity = change.get("identity") or {}
+    payload = change.get("payload") or {}
+    return identity.get("@id") or payload.get("@id")
+
+# Whether a DataVersion creates an element: it has a payload, and no @id or one that is not in the element index
+def _creates_element(change, element_index):
+    if change.get("payload") is None:
+        return False
+    element_id = _change_id(change)
+    return element_id is None or element_id not in element_index
+
+# Returns the @id of the element's owner, or None for root elements. Owners are stored in the "ownedElement" field as [{"@id": owner id}].
+def _owner_id(element):
+    owned_element = element.get("ownedElement")
+    if owned_element:
+        return owned_element[0]["@id"]
+    return None
+
+
+########################################## Element Index ##################################################
+
+# ElementIndex - the loaded elements (records from _element_record()) of a project, indexed so that every lookup is O(1):
+# by id, by name (several elements can share a name), by owner (the children of an element; owner None holds the root elements),
+# and by type. It is kept up to date with add() and remove() as elements are loaded, created, updated, and deleted.
+class ElementIndex:
+
+    def __init__(self, records=()):
+        # dicts with None values are used as insertion-ordered sets of ids
+        self.by_id = {}
+        self.by_name = {}
+        self.children = {}
+        self.by_type = {}
+        for record in records:
+            self.add(record)
+
+    # Adds a record, replacing the previous record of the same element if there was one
+    def add(self, record):
+        element_id = record["id"]
+        if element_id in self.by_id:
+            self.remove(element_id)
+
+        self.by_id[element_id] = record
+        self.by_name.setdefault(record["name"], {})[element_id] = None
+        self.children.setdefault(record["owner_id"], {})[element_id] = None
+        self.by_type.setdefault(record["type"], {})[element_id] = None
+
+    # Removes an element (not its children) and returns its record, or None if it was not in the index
+    def remove(self, element_id):
+        record = self.by_id.pop(element_id, None)
+        if record is not None:
+            _discard(self.by_name, record["name"], element_id)
+            _discard(self.children, record["owner_id"], element_id)
+            _discard(self.by_type, record["type"], element_id)
+        return record
+
+    def get(self, element_id, default=None):
+        return self.by_id.get(element_id, default)
+
+    def __getitem__(self, element_id):
+        return self.by_id[element_id]
+
+    def __contains__(self, element_id):
+        return element_id in self.by_id
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def values(self):
+        return self.by_id.values()
+
+    def ids_by_name(self, name):
+        return list(self.by_name.get(name, ()))
+
+    def ids_by_type(self, type):
+        return list(self.by_type.get(type, ()))
+
+    def children_ids(self, element_id):
+        return list(self.children.get(element_id, ()))
+
+    # An independent copy (records are never modified in place, only replaced, so they are shared)
+    def copy(self):
+        element_index = ElementIndex()
+        element_index.by_id = dict(self.by_id)
+        element_index.by_name = {key: dict(ids) for key, ids in self.by_name.items()}
+        element_index.children = {key: dict(ids) for key, ids in self.children.items()}
+        element_index.by_type = {key: dict(ids) for key, ids in self.by_type.items()}
+        return element_index
+
+    # Applies a commit's changes (DataVersions, payload None for a deleted element) to the records.
+    # Returns what undoes them: the records the changed elements had before (see previous_records() and restore()).
+    def apply_changes(self, changes):
+        previous_records = self.previous_records(changes)
+        for change in changes:
+            element_id = _change_id(change)
+            if change.get("payload") is None:
+                if element_id in self:
+                    self.remove(element_id)
+            else:
+                self.add(_element_record(change["payload"], element_id))
+        return previous_records
+
+    # The records that the elements changed by the given changes have here ({element id: record, or None if it is not here})
+    def previous_records(self, changes):
+        previous_records = {}
+        for change in changes:
+            element_id = _change_id(change)
+            if element_id not in previous_records:
+                previous_records[element_id] = self.by_id.get(element_id)
+        return previous_records
+
+    # Undoes changes, given the records the elements had before them (see previous_records()): elements that had none are removed
+    def restore(self, previous_records):
+        for element_id, record in previous_records.items():
+            if record is not None:
+                self.add(record)
+            elif element_id in self:
+                self.remove(element_id)
+
+    # ids of every element contained (directly or not) in the given element
+    def descendant_ids(self, element_id):
+        descendant_ids = []
+        stack = self.children_ids(element_id)
+        while stack:
+            descendant_id = stack.pop()
+            descendant_ids.append(descendant_id)
+            stack.extend(self.children.get(descendant_id, ()))
+        return descendant_ids
+
+def _discard(ids_by_key, key, element_id):
+    ids = ids_by_key.get(key)
+    if ids is not None:
+        ids.pop(element_id, None)
+        if not ids:
+            del ids_by_key[key]
+
+
+# Attribute values: a number, optionally followed by a unit ("12.5", "12.5 kg", "1e3 [mm]", "20 %"); "12:30" or "3 apples, 2 pears" are no numbers
+_NUMBER_AND_UNIT = (r"^(?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*"
+                    r"(?:\[\s*(?P<bracketed_unit>[^\]]*?)\s*\]|(?P<unit>(?:[^\W\d]|[%°])[\w%°/*^.\-]*))?$")
+
+# Attribute predicates of Project.query(): "attribute name", or "attribute name <operator> value"
+_PREDICATE = re.compile(r"^\s*(?P<attribute>[^<>=!]+?)\s*(?:(?P<operator>==|!=|>=|<=|=|>|<)\s*(?P<value>.+?))?\s*$")
+_COMPARISONS = {"==": operator.eq, "=": operator.eq, "!=": operator.ne, ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+# Roll-ups (Project.rollup()) are kept as partial aggregates (sum, count, min, max) of the values in each subtree
+_ROLLUP_AGGREGATES = {"sum": lambda stats: stats[0],
+                      "count": lambda stats: stats[1],
+                      "mean": lambda stats: stats[0] / stats[1],
+                      "min": lambda stats: stats[2],
+                      "max": lambda stats: stats[3]}
+
+def _merge_stats(stats, other):
+    if stats is None:
+        return other
+    if other is None:
+        return stats
+    return (stats[0] + other[0], stats[1] + other[1], min(stats[2], other[2]), max(stats[3], other[3]))
+
+# Parses attribute names ("attribute name: value", a Series) in one vectorized pass into the columns attribute, value, numeric, and unit of Project.attributes_table
+def _parse_attribute_names(names):
+    if len(names) == 0:
+        return pd.DataFrame({"attribute": pd.Series(dtype=object), "value": pd.Series(dtype=object),
+                             "numeric": pd.Series(dtype=float), "unit": pd.Series(dtype=object)}, index=names.index)
+    named_values = names.str.partition(":")
+    values = named_values[2].str.strip().where(named_values[1] != "", None) # None for names without ":"
+
+    # plain numbers are converted at once; only the other values are matched against number + unit
+    numeric = pd.to_numeric(values, errors="coerce")
+    units = pd.Series(None, index=values.index, dtype=object)
+    others = values[numeric.isna() & values.notna()]
+    if len(others) > 0:
+        numbers = others.str.extract(_NUMBER_AND_UNIT)
+        numeric[others.index] = pd.to_numeric(numbers["number"], errors="coerce")
+        others_units = numbers["bracketed_unit"].fillna(numbers["unit"])
+        units[others.index] = others_units.where(others_units.notna() & (others_units != ""), None)
+
+    return pd.DataFrame({"attribute": named_values[0].str.strip(),
+                         "value": values,
+                         "numeric": numeric.astype(float),
+                         "unit": units})
+
+# Returns (attribute name, numeric value or None) of an attribute named "attribute name: value", parsed like Project.attributes_table
+def _attribute_number(attribute_name):
+    if ":" not in attribute_name:
+        return attribute_name.strip(), None
+    attribute, value = attribute_name.split(":", 1)
+    value = value.strip()
+    number = pd.to_numeric(value, errors="coerce")
+    if pd.isna(number):
+        match = re.match(_NUMBER_AND_UNIT, value)
+        number = float(match.group("number")) if match else None
+    return attribute.strip(), None if number is None else float(number)
+
+
+# QueryResult - the elements found by Project.query(), held as a list of ids. Iterating gives their records
+# (name, id, type, owner_id, desc) from the project's element index; to_frame() gives them as a table like all_elements.
+class QueryResult:
+
+    def __init__(self, project, ids):
+        self.project = project
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        element_index = self.project.element_index
+        return (element_index[element_id] for element_id in self.ids)
+
+    def __contains__(self, element_id):
+        return element_id in set(self.ids)
+
+    def __repr__(self):
+        return f"QueryResult({len(self.ids)} elements)"
+
+    @property
+    def names(self):
+        element_index = self.project.element_index
+        return [element_index[element_id]["name"] for element_id in self.ids]
+
+    def to_frame(self):
+        df_elements = self.project._df_elements
+        return df_elements[df_elements["id"].isin(self.ids)].reset_index(drop=True)
+
+
+# ModelDiff - what changed between two commits of a project (see Project.diff()). Each of added, removed, renamed, reowned (owner changed),
+# and modified (type or description/text changed) is a list of element ids; an element can be both renamed and re-owned, for instance.
+# to_frame() lists every change with the element's name and owner in both commits.
+class ModelDiff:
+
+    KINDS = ["added", "removed", "renamed", "reowned", "modified"]
+
+    def __init__(self, commit_a, commit_b, entries_a, entries_b):
+        self.commit_a = commit_a
+        self.commit_b = commit_b
+        self.added, self.removed, self.renamed, self.reowned, self.modified = [], [], [], [], []
+        self.entries = {} # element id -> (entry in commit_a, entry in commit_b), for the changed elements
+
+        for element_id, entry_b in entries_b.items():
+            entry_a = entries_a.get(element_id)
+            if entry_a == entry_b:
+                continue
+            self.entries[element_id] = (entry_a, entry_b)
+            if entry_a is None:
+                self.added.append(element_id)
+                continue
+            if entry_a[0] != entry_b[0]:
+                self.renamed.append(element_id)
+            if entry_a[1] != entry_b[1]:
+                self.reowned.append(element_id)
+            if entry_a[2:] != entry_b[2:]:
+                self.modified.append(element_id)
+
+        for element_id, entry_a in entries_a.items():
+            if element_id not in entries_b:
+                self.entries[element_id] = (entry_a, None)
+                self.removed.append(element_id)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"ModelDiff({', '.join(f'{len(getattr(self, kind))} {kind}' for kind in self.KINDS)})"
+
+    # The kinds of change ("added", "renamed", ...) of an element; empty if it did not change
+    def kinds(self, element_id):
+        entry_a, entry_b = self.entries.get(element_id, (None, None))
+        if entry_a is None:
+            return ["added"] if entry_b is not None else []
+        if entry_b is None:
+            return ["removed"]
+        return [kind for kind, changed in (("renamed", entry_a[0] != entry_b[0]), ("reowned", entry_a[1] != entry_b[1]), ("modified", entry_a[2:] != entry_b[2:]))
+                if changed]
+
+    def to_frame(self):
+        rows = []
+        for kind in self.KINDS:
+            for element_id in getattr(self, kind):
+                entry_a, entry_b = self.entries[element_id]
+                rows.append({"change": kind, "id": element_id, "type": (entry_b or entry_a)[2],
+                             "old name": entry_a[0] if entry_a else None, "new name": entry_b[0] if entry_b else None,
+                             "old owner_id": entry_a[1] if entry_a else None, "new owner_id": entry_b[1] if entry_b else None})
+        return pd.DataFrame(rows, columns=["change", "id", "type", "old name", "new name", "old owner_id", "new owner_id"], dtype=object)
+
+# What a diff compares of an element: (name, owner_id, type, hash of its description/text)
+def _diff_entry(record):
+    return (record["name"], record["owner_id"], record["type"], hash(tuple(record["desc"] or ())))
+
+
+# CommitSnapshots - in-memory history of a project, used to show any of its commits (see Project.select_commit() and Project.at_commit()):
+# the elements (ElementIndex) of recently shown commits, the changes of commits (their deltas from the previous commit), and what undoes
+# those changes (reverse deltas), so a commit can be rebuilt from an older or a newer one.
+# Snapshots are kept while their total number of elements stays within max_elements, dropping the least recently used first;
+# deltas are small and are all kept. Shared by the views of a project, possibly from several threads.
+class CommitSnapshots:
+
+    def __init__(self, max_elements=SNAPSHOT_BUDGET):
+        self.max_elements = max_elements
+        self.snapshots = OrderedDict()
+        self.deltas = {} # commit id -> its changes (from its previous commit)
+        self.reverse_deltas = {} # commit id -> records of the elements it changed, as they were in its previous commit (see ElementIndex.restore())
+        self.n_elements = 0
+        self.lock = threading.Lock()
+
+    # The snapshot of a commit (shared: do not modify it), or None
+    def get(self, commit_id):
+        with self.lock:
+            snapshot = self.snapshots.get(commit_id)
+            if snapshot is not None:
+                self.snapshots.move_to_end(commit_id)
+            return snapshot
+
+    def put(self, commit_id, snapshot):
+        with self.lock:
+            previous = self.snapshots.pop(commit_id, None)
+            if previous is not None:
+                self.n_elements -= len(previous)
+            self.snapshots[commit_id] = snapshot
+            self.n_elements += len(snapshot)
+
+            while self.n_elements > self.max_elements and len(self.snapshots) > 1:
+                _, dropped = self.snapshots.popitem(last=False)
+                self.n_elements -= len(dropped)
+
+    def __contains__(self, commit_id):
+        return commit_id in self.snapshots
+
+
 #Get Projects - returns a dataFrame of all projects within the host
-def projects_list():
-    projects_url = f"{host}/projects" 
-    projects_response = requests.get(projects_url)
+def projects_list(client=None):
+    client = client or get_client()
+    projects_response = client.get("projects")
 
     if projects_response.status_code == 200:
         projects = projects_response.json()
@@ -62,9 +812,9 @@ def projects_list():
     
 
 #Get Projects - returns a dataFrame of all projects within the host
-def projects_names_list():
-    projects_url = f"{host}/projects" 
-    projects_response = requests.get(projects_url)
+def projects_names_list(client=None):
+    client = client or get_client()
+    projects_response = client.get("projects")
 
     if projects_response.status_code == 200:
         projects = projects_response.json()
@@ -80,9 +830,9 @@ def projects_names_list():
     
 
 #Get Projects - returns a dataFrame of all projects within the host
-def projects_IDs_list():
-    projects_url = f"{host}/projects" 
-    projects_response = requests.get(projects_url)
+def projects_IDs_list(client=None):
+    client = client or get_client()
+    projects_response = client.get("projects")
 
     if projects_response.status_code == 200:
         projects = projects_response.json()
@@ -103,15 +853,13 @@ class Project:
     
     # Initialize the project and allocate its defining variables. You have the option of providing one or more of the inputs, ideally in order of appearance.
     # To specifically initialize a project, use the project ID rather than name or index (e.g., have 2 projects with same name; differentiate by their ID)
-    def __init__(self, name=None, id=None, index=None):
-        self.index = index
-        self.name = name
-        self.id = id
-        self.all_previous_commits = []
-        
-        #################### Initialize the Tree Specific to this Project Project initialization ########################
-
-        self.tree = Tree()
+    # All requests go through the given APIClient, or through the shared client of the current host if none is given.
+    # Elements are downloaded in pages of page_size elements.
+    # After an edit, the changes of the new commit are applied to the loaded model; set verify_changes to always read them back from the server.
+    # With use_cache, the elements of a commit are read from the on-disk element cache when they have been downloaded before.
+    # If the projects table (projects_list()) was already fetched, pass it as projects to resolve the project without requesting it again.
+    def __init__(self, name=None, id=None, index=None, client=None, page_size=None, verify_changes=False, use_cache=True, projects=None):
+        self._setup(name, id, index, client, page_size, verify_changes, use_cache)
 
         #################################################################################################################
         ################################################# __INIT__ SECTION ##############################################
@@ -122,29 +870,8 @@ class Project:
            
         #region __INIT__ PROJECT DEFINITION VARIABLES
         
-        if self.index != None: # given index of project in projects_list(), set self.name and self.id
-            df_projects = projects_list()
-            try:
-                self.name = df_projects.iloc[self.index, 0]
-                self.id = df_projects.iloc[self.index, 1]
-            except:
-                ValueError("Index does not exist or is out of range.")
-
-        elif self.name != None: # given name of project in projects_list(), set self.index and self.id
-            df_projects = projects_list()
-            try:
-                self.index = df_projects.index[df_projects["Project Name"] == self.name].to_list()[0]
-                self.id = df_projects.loc[df_projects["Project Name"] == self.name, "Project ID"].values[0]
-            except:
-                raise ValueError("Project does not exist or name has typo.")
-
-        elif self.id != None: # given id of project in projects_list(), set self.index and self.name
-            df_projects = projects_list()
-            try:
-                self.index = df_projects.index[df_projects["Project ID"] == self.id].to_list()[0]
-                self.name = df_projects.loc[df_projects["Project ID"] == self.id, "Project Name"].values[0]
-            except:
-                raise ValueError("Project ID does not exist or has typo.")       
+        if self.index != None or self.name != None or self.id != None:
+            self._resolve_project(projects if projects is not None else projects_list(self.client))
 
         #endregion
         
@@ -157,29 +884,10 @@ class Project:
         
         # Get All Commits and automatically select the latest commit as the current commit
         # Note: if new project or no commits have been done, this will error out because it will show as "[]"
-        commits_url = f"{host}/projects/{self.id}/commits" 
-        commits_response = requests.get(commits_url)
+        commits_response = self.client.get(f"projects/{self.id}/commits")
 
         if commits_response.status_code == 200:
-            commits = commits_response.json()
-
-            commits_data = list(map(lambda b: {'Commit ID':b['@id'], "Commit Created":b['created']}, commits))
-        
-            df_commits = pd.DataFrame.from_records(commits_data)
-
-            df_commits['Commit Created'] = pd.to_datetime(df_commits['Commit Created'])  # Convert to datetime
-            df_commits = df_commits.sort_values(by='Commit Created', ascending=False)    # Sort from newest to oldest
-
-            # Reset the index if desired
-            df_commits = df_commits.reset_index(drop=True)
-
-            self.all_commits = df_commits
-            try:
-                self.latest_commit = df_commits.iloc[0]["Commit ID"]
-                self.current_commit = self.latest_commit
-
-            except:
-                raise ValueError("No commits found in project.")
+            self._set_commits(commits_response.json())
 
         else:
             pprint(f"Status Code: {commits_response.status_code}. Problem in fetching commits.")
@@ -195,93 +903,9 @@ class Project:
         #region ELEMENTS
 
         # Get All Elements of selected project regardless if its a part, attribute, or requirement. Their respective "Type"s are PartUsage, AttributeUsage, and RequirementUsage 
+        # The elements are downloaded ONCE, page by page, and that single pass feeds all_elements, all_attributes, elements_attributes, all_reqs and the tree.
         # Note: if new project or no commits have been done, this will error out because it will show as "[]"
-        elements_url = f"{host}/projects/{self.id}/commits/{self.current_commit}/elements" 
-        response = requests.get(elements_url)
-        
-        if response.status_code == 200:
-            elements_data = response.json() #type is LIST
-            #type(response.json()[0]) IS DICT!
-            # elements_name_to_print = elements_data['name'] if elements_data['name'] else 'N/A'
-            
-            df_elements = pd.DataFrame([{"name": element["name"], "id": element["@id"], "type": element["@type"], "owner_id": element["ownedElement"]} for element in elements_data])
-            
-            try:
-                self.all_elements = df_elements.sort_values("name").sort_values("type", ascending=False).reset_index(drop=True)
-                self.elements_names = df_elements["name"]
-                self.elements_ids = df_elements["id"]
-                self.elements_types = df_elements["type"]
-            except:
-                raise ValueError("No elements found in current commit.")
-
-        else:
-            pprint(f"Problem in fetching branches of {self.name} {self.id}")
-            pprint(commits_response)
-
-        #endregion
-
-        #################################################################################################################
-        
-
-        ############################################ __INIT__ ATTRIBUTES ################################################
-        
-        #region ATTRIBUTES
-
-        # Gets all elements that are an attribute (AttributeUsage class)
-        
-        elements_url = f"{host}/projects/{self.id}/commits/{self.current_commit}/elements" 
-        response = requests.get(elements_url)
-        
-        if response.status_code == 200:
-            elements_data = response.json()
-            
-            try:
-                df_attributes = pd.DataFrame([{"name": element["name"], "id": element["@id"], "owner_id": element["ownedElement"][0]["@id"]} for element in elements_data if element["@type"]=="AttributeUsage"])
-
-                self.all_attributes = df_attributes
-
-                # now for every attribute found, add it to the dictionary of the owner; create and add the dictionary to the list
-                self.elements_attributes = {}
-
-                for index, attribute in df_attributes.iterrows(): 
-
-                    att_name, att_value = attribute["name"].split(":")
-                    owner_name = df_elements.loc[df_elements["id"] == attribute["owner_id"], "name"].values[0]
-                    if owner_name not in self.elements_attributes:
-                        self.elements_attributes[owner_name] = {att_name: att_value}
-
-                    else: # a owner dictionary already exists within the list, so add into the dict
-                        self.elements_attributes[owner_name].update({att_name: att_value})
-
-            except:
-                print("No attributes found.")
-
-        #endregion
-
-        #################################################################################################################
-
-        ############################################ __INIT__ REQUIREMENTS ##############################################
-
-        #region REQUIREMENTS
-
-        # Get All requirements in the initialized project (RequirementUsage class)
-        # Note: if new project or no commits have been done, this will error out because it will show as "[]"
-        elements_url = f"{host}/projects/{self.id}/commits/{self.current_commit}/elements" 
-        response = requests.get(elements_url)
-        
-        if response.status_code == 200:
-            elements_data = response.json() #type is LIST
-            
-            df_reqs = pd.DataFrame([{"name": element["name"], "desc": element["text"], "id": element["@id"], "type": element["@type"], "owner_id": element["ownedElement"]} for element in elements_data if element["@type"]=="RequirementUsage"])
-            
-            try:
-                self.all_reqs = df_reqs.sort_values("name")
-            except:
-                print("No requirements found in current commit.")
-
-        else:
-            pprint(f"Problem in fetching branches of {self.name} {self.id}")
-            pprint(commits_response)
+        self._load_elements(self._fetch_elements())
 
         #endregion
 
@@ -311,34 +935,71 @@ class Project:
 
         ##########
 
-        _df_elements_not_comment = df_elements[df_elements["type"]!="Comment"]
-
         ### UNCOMMENT ###
-        for index, element in _df_elements_not_comment.iterrows():
-            node_name = element["name"]
-            node_id = element["id"]
-            parent_name = None
-            node_type = element["type"]
-            # Extract parent_name from owner_id if available
-            if element["owner_id"]:
-                parent_id = element["owner_id"][0]["@id"]
-                parent_row = _df_elements_not_comment[_df_elements_not_comment["id"] == parent_id]
-                if not parent_row.empty:
-                    parent_name = parent_row.iloc[0]["name"]
-            # Add the node and its parents
-            self.add_node_with_parents(self.tree, _df_elements_not_comment, node_name, node_id, parent_name, node_type)
-        
-        dot = self.generate_dot(self.tree)
-        # Visualize with pygraphviz
-        G = pgv.AGraph(string=dot)
-        G.layout(prog='dot')
-        G.draw('tree.png')  # Saves as tree.png
+        self._update_tree()
 
         #endregion
 
         #################################################################################################################
 
-            
+    #################################################################################################################
+    ########################################### PROJECT LOADING STEPS ###############################################
+    #################################################################################################################
+
+    # The steps of __init__, shared with the other ways of loading a project (e.g. AsyncProject.load())
+
+    # Sets the defining variables of the project, before anything is loaded
+    def _setup(self, name=None, id=None, index=None, client=None, page_size=None, verify_changes=False, use_cache=True):
+        self.index = index
+        self.name = name
+        self.id = id
+        self.client = client or get_client()
+        self.page_size = page_size or ELEMENTS_PAGE_SIZE
+        self.verify_changes = verify_changes
+        self.use_cache = use_cache
+        self._transaction = None # open Transaction, see transaction()
+        self._diffs = {} # (commit a, commit b) -> ModelDiff; commits never change, so neither do their diffs
+        self.history = CommitSnapshots() # snapshots and changes of the commits shown, see select_commit()
+        self.all_previous_commits = []
+        
+        #################### Initialize the Tree Specific to this Project Project initialization ########################
+
+        self.tree = Tree()
+
+    # Given the projects table (projects_list()), completes the project name, id, and index from whichever of them was given
+    def _resolve_project(self, df_projects):
+        if self.index != None: # given index of project in projects_list(), set self.name and self.id
+            try:
+                self.name = df_projects.iloc[self.index, 0]
+                self.id = df_projects.iloc[self.index, 1]
+            except:
+                raise ValueError("Index does not exist or is out of range.")
+
+        elif self.name != None: # given name of project in projects_list(), set self.index and self.id
+            try:
+                self.index = df_projects.index[df_projects["Project Name"] == self.name].to_list()[0]
+                self.id = df_projects.loc[df_projects["Project Name"] == self.name, "Project ID"].values[0]
+            except:
+                raise ValueError("Project does not exist or name has typo.")
+
+        elif self.id != None: # given id of project in projects_list(), set self.index and self.name
+            try:
+                self.index = df_projects.index[df_projects["Project ID"] == self.id].to_list()[0]
+                self.name = df_projects.loc[df_projects["Project ID"] == self.id, "Project Name"].values[0]
+            except:
+                raise ValueError("Project ID does not exist or has typo.")       
+
+    # Given the commits of the project (list of commit dicts), sets all_commits and selects the latest commit as the current commit
+    def _set_commits(self, commits):
+        df_commits = _commits_dataframe(commits)
+
+        self.all_commits = df_commits
+        try:
+            self.latest_commit = df_commits.iloc[0]["Commit ID"]
+            self.current_commit = self.latest_commit
+
+        except:
+            raise ValueError("No commits found in project.")
 
     #################################################################################################################
     ######################################### PROJECT CLASS METHODS SECTION #########################################
@@ -349,7 +1010,7 @@ class Project:
     def create_element(self, name, owner_name=None, repeat=False): 
         if repeat == False:
             # we gotta check our elements to make sure there is no other one of the same name. If so, dont create the commit. 
-            if name in self.elements_names.values:
+            if self._name_exists(name):
                 print("There is an existing element with the same name. If you want to create another, add the 'repeat=True' argument.")
                 return
 
@@ -358,7 +1019,7 @@ class Project:
             # find the owner_name ID
             
             try:
-                owner_id = self.all_elements.loc[self.all_elements["name"] == owner_name, "id"].values[0]
+                owner_id = self._id_by_name(owner_name)
             except:
                 raise ValueError(f"No owner element of name {owner_name} was found. Is there some typo?")
 
@@ -399,122 +1060,71 @@ class Project:
             }
             }
 
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit1_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-            self._update_tree()
-
-            # ### Tree ###
-            # if owner_name != None: # if it has an owner
-            #     self.tree.create_node(f"{name}", f"{name}", owner_name)
-            # else:
-            #     self.tree.create_node(f"{name}", f"{name}")
+        self._post_commit(commit_body, f"Problem in creating a new commit in this project.")
 
-        else:
-            pprint(f"Problem in creating a new commit in this project.")
-            pprint(commit_post_response)
-
-    # Deletes the named part. Technically this can be used to delete any element (part, attribute, or requirement) 
-    # because the commit body just removes the payload, but ideally use it only for parts. Dedicated attribute and requirement removal
+    # Deletes the named part together with everything it contains (child parts, attributes, requirements). Technically this can be used
+    # to delete any element because the commit body just removes the payload, but ideally use it only for parts. Dedicated attribute and requirement removal
     # functions were created to make then modyfiable into any specific thing the programmer may want. 
+    # The descendants are found locally from the containment hierarchy and the whole subtree is removed in ONE commit, so either everything
+    # is deleted or nothing is (no orphans left behind, which would break the single root of the tree).
+    # Returns {"removed": number of elements deleted, "seconds": time taken, "commit": commit id}, or None if nothing was deleted.
+    # Inside a transaction, the subtree also holds the elements created or moved under it earlier in the transaction, and the deletion
+    # is only queued: "commit" is None and "queued" is True, and nothing is deleted until the transaction commits.
     def delete_element(self, name, id=''):
-        if id != '': # gives id is very specific, but if they give only name, there may be more than 1 with the same name
+        start_time = time.perf_counter()
 
-            commit_body = {
-            "@type": "Commit",
-            "change": [
-                {
-                "@type": "DataVersion",
-                "payload": None,
-                "identity": {
-                    "@id": id
-                }
-                }
-            ],
-            "previousCommit": {
-                "@id": self.current_commit
-            }
-            }
-        else:
-            if len(self.all_elements.loc[self.all_elements["name"] == name, "id"]) > 1:
+        if id == '': # gives id is very specific, but if they give only name, there may be more than 1 with the same name
+            if len(self.element_index.ids_by_name(name)) > 1:
                 print(f"There is more than 1 element with the name {name}. Specify which to delete with the element ID.")
                 return
             
             try:
-                id = self.all_elements.loc[self.all_elements["name"] == name, "id"].values[0]
+                id = self._id_by_name(name)
             except:
                 raise ValueError(f"There is no element of name {name} to delete. Is there a typo?")
 
-            commit_body = {
-            "@type": "Commit",
-            "change": [
-                {
-                "@type": "DataVersion",
-                "payload": None,
-                "identity": {
-                    "@id": id
-                }
-                }
-            ],
-            "previousCommit": {
-                "@id": self.current_commit
+        deleted_ids = [id] + self._descendant_ids(id)
+
+        commit_body = {
+        "@type": "Commit",
+        "change": [
+            {
+            "@type": "DataVersion",
+            "payload": None,
+            "identity": {
+                "@id": deleted_id
             }
             }
+            for deleted_id in deleted_ids
+        ],
+        "previousCommit": {
+            "@id": self.current_commit
+        }
+        }
 
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit3_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-
-            ### Tree ###
-
-            # Deletes all successing elements
-            # This little block is only found here because attributes nor requirements
-            # have any children.
-
-            ## UNCOMMENT ##
-            successors = self.tree.children(name)
+        commit = self._post_commit(commit_body, f"Problem in deleting {name} element.")
+        if commit is None:
+            return
 
-            for successor in successors:
-                self.delete_element(successor.identifier)
-            self.tree.remove_node(name)
-            self._update_tree()
+        elapsed = time.perf_counter() - start_time
+        if isinstance(commit, Transaction):
+            print(f"Queued the deletion of {name} and its {len(deleted_ids) - 1} descendants ({len(deleted_ids)} elements); "
+                  f"they are deleted when the transaction commits.")
+            return {"removed": len(deleted_ids), "seconds": elapsed, "commit": None, "queued": True}
 
-        else:
-            pprint(f"Problem in deleting {name} element.")
-            pprint(commit_post_response)
+        print(f"Deleted {name} and its {len(deleted_ids) - 1} descendants ({len(deleted_ids)} elements) in {elapsed:.2f} s.")
+        return {"removed": len(deleted_ids), "seconds": elapsed, "commit": commit.get("@id"), "queued": False}
 
     # Update the part with a new name and/or a new owner
     def update_element(self, name, new_name, new_owner=None): 
         
-        element_id = self.all_elements.loc[self.all_elements["name"] == name, "id"].values[0]
+        element_id = self._id_by_name(name)
         
         if new_owner != None and new_name != None: #update both the name and the owner
             owner = new_owner
             # find the new_owner ID
             try:
-                new_owner_id = self.all_elements.loc[self.all_elements["name"] == new_owner, "id"].values[0]
+                new_owner_id = self._id_by_name(new_owner)
             except:
                 raise ValueError(f"No owner element of name {new_owner} was found. Is there some typo?")
 
@@ -543,7 +1153,7 @@ class Project:
             owner = new_owner
             # find the new_owner ID
             try:
-                new_owner_id = self.all_elements.loc[self.all_elements["name"] == new_owner, "id"].values[0]
+                new_owner_id = self._id_by_name(new_owner)
             except:
                 raise ValueError(f"No owner element of name {new_owner} was found. Is there some typo?")
 
@@ -570,9 +1180,10 @@ class Project:
 
         elif new_name != None: # only update the element name
             
-            # find the new_owner ID
-            try:
-                owner_id = self.all_elements.loc[self.all_elements["name"] == name, "owner_id"].values[0][0]["@id"]
+            # find the current owner ID
+            owner_id = self._owner_id_by_name(name)
+
+            if owner_id is not None:
 
                 commit_body = {
                 "@type": "Commit",
@@ -595,7 +1206,7 @@ class Project:
                 }
                 }
 
-            except: # didnt find an owner, so could be updating root node/part
+            else: # didnt find an owner, so could be updating root node/part
                 
                 # raise ValueError(f"Problem in updating only the name of the element.")
 
@@ -619,34 +1230,14 @@ class Project:
                 }
                 }
 
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit1_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-
-            self.tree.remove_node(name)
-            self._update_tree()
-
-        else:
-            pprint(f"Problem in creating a new commit in this project. (updating element)")
-            pprint(commit_post_response)
+        self._post_commit(commit_body, f"Problem in creating a new commit in this project. (updating element)")
 
 
     ### ATTRIBUTES ###
     # Add an attribute to the model as an AttributeUsage class and ties it to the named element as its owner
     def add_attribute(self, attribute_name, value, element_name):
         
-        owner_id = self.all_elements.loc[self.all_elements["name"] == element_name, "id"].values[0]
+        owner_id = self._id_by_name(element_name)
 
         commit_body = {
             "@type": "Commit",
@@ -665,24 +1256,7 @@ class Project:
             }
             }
         
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit1_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-            self._update_tree()
-        else:
-            pprint(f"Problem in adding attribute to project.")
-            pprint(commit_post_response.text)
+        self._post_commit(commit_body, f"Problem in adding attribute to project.")
 
     # Removes the named attribute from the model and removes the tie to the owner
     def remove_attribute(self, attribute_name, id=''):
@@ -704,11 +1278,11 @@ class Project:
             }
             }
         else:
-            if len(self.all_elements.loc[self.all_elements["name"] == attribute_name, "id"]) > 1:
+            if len(self.element_index.ids_by_name(attribute_name)) > 1:
                 print(f"There is more than 1 element with the name {attribute_name}. Specify which to delete with the element ID.")
                 return
             
-            id = self.all_elements.loc[self.all_elements["name"] == attribute_name, "id"].values[0]
+            id = self._id_by_name(attribute_name)
 
             commit_body = {
             "@type": "Commit",
@@ -726,32 +1300,13 @@ class Project:
             }
             }
 
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit3_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-            
-            self.tree.remove_node(attribute_name)
-            self._update_tree()
-        else:
-            pprint(f"Problem in deleting {attribute_name} attribute.")
-            pprint(commit_post_response)
+        self._post_commit(commit_body, f"Problem in deleting {attribute_name} attribute.")
 
     # updates the named attribute with a new attribute value
     def update_attribute(self, attribute_name, new_atribute_value): 
-        only_att_name, _ = attribute_name.split(":")
-        element_id = self.all_elements.loc[self.all_elements["name"] == attribute_name, "id"].values[0]
-        owner_id = self.all_elements.loc[self.all_elements["name"] == attribute_name, "owner_id"].values[0][0]["@id"]
+        only_att_name, _ = attribute_name.split(":", 1)
+        element_id = self._id_by_name(attribute_name)
+        owner_id = self._owner_id_by_name(attribute_name)
 
 
         commit_body = {
@@ -775,27 +1330,7 @@ class Project:
         }
         }
 
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit1_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-
-            self.tree.remove_node(attribute_name)
-            self._update_tree()
-
-        else:
-            pprint(f"Problem in creating a new commit in this project. (updating element)")
-            pprint(commit_post_response)
+        self._post_commit(commit_body, f"Problem in creating a new commit in this project. (updating element)")
 
 
     ### REQUIREMENTS ###
@@ -804,12 +1339,12 @@ class Project:
     def create_requirement(self, req_name, description, owner_name, repeat=False):
         if repeat == False:
             # we gotta check our elements to make sure there is no other one of the same name. If so, dont create the commit. 
-            if req_name in self.elements_names.values:
+            if self._name_exists(req_name):
                 print("There is an existing requirement with the same name. If you want to create another, add the 'repeat=True' argument.")
                 return
 
         # find the owner_name ID
-        owner_id = self.all_elements.loc[self.all_elements["name"] == owner_name, "id"].values[0]
+        owner_id = self._id_by_name(owner_name)
 
         commit_body = {
         "@type": "Commit",
@@ -831,24 +1366,7 @@ class Project:
         }
         }
 
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit1_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-            self._update_tree()
-        else:
-            pprint(f"Problem in creating a new commit in this project.")
-            pprint(commit_post_response)
+        self._post_commit(commit_body, f"Problem in creating a new commit in this project.")
 
     # Removes named requirement
     def delete_requirement(self, req_name, id=''):
@@ -870,11 +1388,11 @@ class Project:
             }
             }
         else:
-            if len(self.all_elements.loc[self.all_elements["name"] == req_name, "id"]) > 1:
+            if len(self.element_index.ids_by_name(req_name)) > 1:
                 print(f"There is more than 1 element with the name {req_name}. Specify which to delete with the element ID.")
                 return
             
-            id = self.all_elements.loc[self.all_elements["name"] == req_name, "id"].values[0]
+            id = self._id_by_name(req_name)
 
             commit_body = {
             "@type": "Commit",
@@ -892,32 +1410,13 @@ class Project:
             }
             }
 
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit3_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-
-            self.tree.remove_node(req_name)
-            self._update_tree()
-        else:
-            pprint(f"Problem in deleting {req_name} element.")
-            pprint(commit_post_response)
+        self._post_commit(commit_body, f"Problem in deleting {req_name} element.")
 
     # Update the named requirement with a new requirement name and/or a new description
     def update_requirement(self, req_name, new_req_name=None, new_desc=None): # Can only update the name or description, NOT the owner
         
-        element_id = self.all_elements.loc[self.all_elements["name"] == req_name, "id"].values[0]
-        owner_id = self.all_elements.loc[self.all_elements["name"] == req_name, "owner_id"].values[0][0]["@id"]
+        element_id = self._id_by_name(req_name)
+        owner_id = self._owner_id_by_name(req_name)
 
         
         if new_req_name != None and new_desc != None: #update both the name and the description
@@ -970,7 +1469,7 @@ class Project:
 
         elif new_req_name != None: # only update the element name
             
-            desc = self.all_reqs.loc[self.all_reqs["name"] == req_name, "desc"].values[0][0]
+            desc = self._record(element_id)["desc"][0]
             
             commit_body = {
             "@type": "Commit",
@@ -994,27 +1493,7 @@ class Project:
             }
             }
 
-        commit_post_url = f"{host}/projects/{self.id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
-
-        commit1_id = ""
-
-        if commit_post_response.status_code == 200:
-            commit_response_json = commit_post_response.json()
-            pprint(commit_response_json)
-            self.previous_commit = self.current_commit
-            self.current_commit = commit_response_json['@id']
-            self._update_commits_and_elements()
-
-            self.tree.remove_node(req_name)
-            self._update_tree()
-
-        else:
-            pprint(f"Problem in creating a new commit in this project. (updating element)")
-            pprint(commit_post_response)
+        self._post_commit(commit_body, f"Problem in creating a new commit in this project. (updating element)")
 
 
 
@@ -1025,168 +1504,1216 @@ class Project:
 
     ### UPDATING COMMITS AND ELEMENTS DATAFRAMES AFTER UPDATING MODEL; KEEPS EVERYTHING UP TO DATE AS LINES ARE RUNNING IN CODE CALLING THESE FUNCTIONS ###
     def _update_commits(self):
-        commits_url = f"{host}/projects/{self.id}/commits" 
-        commits_response = requests.get(commits_url)
+        commits_response = self.client.get(f"projects/{self.id}/commits")
 
         if commits_response.status_code == 200:
-            commits = commits_response.json()
+            self.all_commits = _commits_dataframe(commits_response.json())
 
-            commits_data = list(map(lambda b: {'Commit ID':b['@id'], "Commit Created":b['created']}, commits))
-        
-            df_commits = pd.DataFrame.from_records(commits_data)
+    # Downloads (or reads from the element cache) the elements of the current commit page by page. This is the only place the elements endpoint is called.
+    def _fetch_elements(self):
+        return iter_elements(self.id, self.current_commit, page_size=self.page_size, client=self.client, use_cache=self.use_cache)
 
-            df_commits['Commit Created'] = pd.to_datetime(df_commits['Commit Created'])  # Convert to datetime
-            df_commits = df_commits.sort_values(by='Commit Created', ascending=False)    # Sort from newest to oldest
+    # Loads the elements of the current commit in a single pass over the element pages. Each element is reduced to a small record
+    # (name, id, type, owner_id, desc) as soon as its page arrives, so the raw JSON of the whole model is never held at once.
+    # These records, held in self.element_index (see ElementIndex), are the single source of the project's element views: all_elements
+    # (and its names, ids, and types), all_attributes, all_reqs (tables built on first use, see _tables()), elements_attributes, and the tree.
+    def _load_elements(self, element_batches):
+        element_index = ElementIndex()
 
-            # Reset the index if desired
-            df_commits = df_commits.reset_index(drop=True)
+        for batch in element_batches:
+            for element in batch:
+                element_index.add(_element_record(element))
 
-            self.all_commits = df_commits
+        self._set_element_index(element_index)
 
-    def _update_elements(self):
-    # Create a function that updates the all_elements and related self. variables after creating or deleting an element, attribute, or requirement
-        elements_url = f"{host}/projects/{self.id}/commits/{self.current_commit}/elements" 
-        response = requests.get(elements_url)
-        
-        if response.status_code == 200:
-            elements_data = response.json() #type is LIST
-            #type(response.json()[0]) IS DICT!
-            # elements_name_to_print = elements_data['name'] if elements_data['name'] else 'N/A'
-            
-            df_elements = pd.DataFrame([{"name": element["name"], "id": element["@id"], "type": element["@type"]} for element in elements_data]).sort_values("name")
-            df_reqs = pd.DataFrame([{"name": element["name"], "desc": element["text"], "id": element["@id"], "type": element["@type"], "owner_id": element["ownedElement"]} for element in elements_data if element["@type"]=="RequirementUsage"])
+    # Makes the given ElementIndex the elements of the project and derives elements_attributes from it
+    def _set_element_index(self, element_index):
+        if not element_index:
+            raise ValueError("No elements found in current commit.")
 
-            try:
-                self.all_elements = df_elements.sort_values("type", ascending=False).reset_index(drop=True)
-                self.elements_names = df_elements["name"]
-                self.elements_ids = df_elements["id"]
-                self.elements_types = df_elements["type"]
-                if df_reqs.empty==False:
-                    self.all_reqs = df_reqs.sort_values("name")
-            except:
-                raise ValueError("No elements found in current commit.")
+        self.element_index = element_index
+        self._frames = None
+        self._rollups = {} # see rollup()
 
-        else:
-            pprint(f"Status Code: {response.status_code}. Problem in fetching elements.")
+        ### ATTRIBUTES ###
+        # now for every attribute found, add it to the dictionary of the owner
+        self.elements_attributes = {}
+        for attribute_id in element_index.ids_by_type("AttributeUsage"):
+            self._add_element_attribute(element_index[attribute_id])
+
+    # Create a function that updates the all_elements and related self. variables after creating or deleting an element, attribute, or requirement
+    def _update_elements(self):
+        self._load_elements(self._fetch_elements())
 
     def _update_commits_and_elements(self):
         self._update_commits()
         self._update_elements()
 
-    ### TREE ####
+    ### ELEMENT TABLES ###
+    # The DataFrames are derived from self.element_index and only rebuilt the first time they are used after the elements change.
+
+    def _tables(self):
+        if self._frames is None:
+            records = self.element_index.values()
 
-    def add_node_with_parents(self, tree, df, node_name, node_id, parent_name=None, type=None):
-        """
-        Recursively adds a node to the tree, ensuring its parent and ancestors are also added.
-        """
-        # If the node already exists, and you are not updating a current element, do nothing
-        if node_name in self.tree.nodes:
+            # dtype=object keeps missing owners as None
+            df_elements = pd.DataFrame([(record["name"], record["id"], record["type"], record["owner_id"]) for record in records],
+                                       columns=["name", "id", "type", "owner_id"], dtype=object)
+            df_reqs = _requirements_frame(record for record in records if record["type"] == "RequirementUsage")
+
+            self._frames = {
+                "elements": df_elements,
+                "all_elements": df_elements.sort_values("name").sort_values("type", ascending=False).reset_index(drop=True),
+                "all_attributes": df_elements.loc[df_elements["type"] == "AttributeUsage", ["name", "id", "owner_id"]].reset_index(drop=True),
+                "all_reqs": df_reqs.sort_values("name"),
+            }
+        return self._frames
+
+    # Typed table of the attributes, parsed from their names ("attribute name: value") in one vectorized pass, with the columns
+    #   id, owner_id, owner (owner name), attribute (attribute name), value (the text after the first ":", so values may contain ":"),
+    #   numeric (the value as a number, NaN if it is not one), unit (what follows the number: "kg" for "12.5 kg" or "12.5 [kg]", None if nothing)
+    # Built on first use after the elements change, like the other tables.
+    @property
+    def attributes_table(self):
+        frames = self._tables()
+        if "attributes" not in frames:
+            df_attributes = frames["all_attributes"]
+            owner_names = frames["elements"].drop_duplicates("id").set_index("id")["name"]
+
+            frames["attributes"] = pd.concat([pd.DataFrame({"id": df_attributes["id"],
+                                                            "owner_id": df_attributes["owner_id"],
+                                                            "owner": df_attributes["owner_id"].map(owner_names)}),
+                                              _parse_attribute_names(df_attributes["name"])], axis=1)
+        return frames["attributes"]
+
+    # The attributes table by attribute name: {attribute name: its rows (attributes without a value left out)}
+    def _attribute_values(self):
+        frames = self._tables()
+        if "attribute_values" not in frames:
+            df_values = self.attributes_table
+            df_values = df_values[df_values["value"].notna()]
+            frames["attribute_values"] = {attribute: df_attribute.reset_index(drop=True)
+                                          for attribute, df_attribute in df_values.groupby("attribute", sort=False)}
+        return frames["attribute_values"]
+
+    # Depth of every element in the containment tree (root elements are at depth 0), aligned with the elements table
+    def _depths(self):
+        frames = self._tables()
+        if "depths" not in frames:
+            element_index = self.element_index
+            depths = {}
+            level, depth = element_index.children_ids(None), 0
+            while level:
+                next_level = []
+                for element_id in level:
+                    depths[element_id] = depth
+                    next_level.extend(element_index.children.get(element_id, ()))
+                level, depth = next_level, depth + 1
+            frames["depths"] = frames["elements"]["id"].map(depths)
+        return frames["depths"]
+
+    @property
+    def _df_elements(self):
+        return self._tables()["elements"]
+
+    # All elements (parts, attributes, requirements, comments) of the current commit
+    @property
+    def all_elements(self):
+        return self._tables()["all_elements"]
+
+    @property
+    def elements_names(self):
+        return self._df_elements["name"]
+
+    @property
+    def elements_ids(self):
+        return self._df_elements["id"]
+
+    @property
+    def elements_types(self):
+        return self._df_elements["type"]
+
+    # Gets all elements that are an attribute (AttributeUsage class)
+    @property
+    def all_attributes(self):
+        return self._tables()["all_attributes"]
+
+    # Get All requirements in the initialized project (RequirementUsage class)
+    @property
+    def all_reqs(self):
+        return self._tables()["all_reqs"]
+
+    # Requirements of any commit (id, or index in all_commits; default: the current commit), as a table with the columns of all_reqs.
+    # A commit in memory (the current commit, or one kept in self.history) is read from its elements. For any other commit, only its requirements
+    # are requested, with only the fields the table needs (query pushdown, see query_elements()), so its model is neither downloaded nor built.
+    def requirements_table(self, commit=None):
+        commit_id = self.current_commit if commit is None else self._commit_id(commit)
+        if commit_id == self.current_commit:
+            return self.all_reqs
+
+        element_index = self.history.get(commit_id)
+        if element_index is not None:
+            records = [element_index[element_id] for element_id in element_index.ids_by_type("RequirementUsage")]
+        else:
+            records = [_element_record(element) for element in query_elements(self.id, commit_id, "RequirementUsage", client=self.client, use_cache=self.use_cache)]
+        return _requirements_frame(records).sort_values("name")
+
+    # elements_attributes maps owner name -> {attribute name: value}, from attributes named "attribute name: value"
+    def _add_element_attribute(self, record):
+        owner = self.element_index.get(record["owner_id"])
+        if owner is None or ":" not in record["name"]:
             return
+        att_name, att_value = record["name"].split(":", 1)
+        self.elements_attributes.setdefault(owner["name"], {})[att_name] = att_value
 
-        # Determine the format of the text in tree. The identifier remains solely the element name. the tag is what changes.
-        if type == "AttributeUsage":
-            node_name_formatted = f"Attribute:\n {node_name}"
-        elif type == "RequirementUsage":
-            req_desc = self.all_reqs.loc[self.all_reqs["name"]==node_name, "desc"].values[0][0]
+    def _remove_element_attribute(self, record):
+        owner = self.element_index.get(record["owner_id"])
+        if owner is None or ":" not in record["name"]:
+            return
+        att_name, _ = record["name"].split(":", 1)
+        owner_attributes = self.elements_attributes.get(owner["name"], {})
+        owner_attributes.pop(att_name, None)
+        if not owner_attributes:
+            self.elements_attributes.pop(owner["name"], None)
+
+    ### IMPORT ###
+    # Imports elements from a table: a CSV, Excel, or JSON file (path or file object, see read_import_table()), a DataFrame, or a list of dicts.
+    # One row per element, with the columns (case-insensitive)
+    #   name:        name of the element (for an attribute, the attribute name, e.g. "mass")
+    #   type:        "Part" (default), "Attribute", or "Requirement" (or PartUsage, AttributeUsage, RequirementUsage)
+    #   owner:       name of the owner, either another row or an element already in the model (default: the root of the tree)
+    #   value:       value of an attribute
+    #   description: description of a requirement
+    # Rows are ordered so that every owner is created before what it owns, and posted in commits of chunk_size rows (one Transaction each).
+    # Rows whose element is already in the model (same name, or same "name: value" on the same owner for an attribute; see _import_row_exists()) are skipped unless repeat is True, so a file can be imported again. Progress is printed after every commit,
+    # or given to progress(imported rows, total rows) if it is a function (None: silent).
+    # Returns {"imported": number of rows imported, "skipped": rows skipped, "commits": number of commits, "seconds": time taken}.
+    def import_model(self, source, chunk_size=1000, repeat=False, progress=True, format=None, sheet_name=0):
+        start_time = time.perf_counter()
+        rows = _import_rows(source, format, sheet_name)
+        root_name = self.element_index[self.tree.root]["name"] if self.tree.root is not None else None
+
+        skipped = 0
+        if not repeat:
+            kept_rows = [row for row in rows if not self._import_row_exists(row, root_name)]
+            skipped = len(rows) - len(kept_rows)
+            rows = kept_rows
+        rows = self._owners_first(rows, root_name)
+
+        imported = commits = 0
+        for chunk_start in range(0, len(rows), chunk_size):
+            chunk = rows[chunk_start:chunk_start + chunk_size]
+            with self.transaction() as transaction:
+                for row in chunk:
+                    owner = row["owner"] or root_name
+                    if row["type"] == "AttributeUsage":
+                        self.add_attribute(row["name"], row["value"], owner)
+                    elif row["type"] == "RequirementUsage":
+                        self.create_requirement(row["name"], row["description"], owner, repeat=True)
+                    else:
+                        self.create_element(row["name"], owner, repeat=True)
+
+            if transaction.result is None:
+                raise ValueError(f"Import stopped: the commit of rows {chunk_start + 1} to {chunk_start + len(chunk)} was rejected. "
+                                 f"{imported} rows were imported in {commits} commits before it.")
+            imported += len(chunk)
+            commits += 1
+
+            if callable(progress):
+                progress(imported, len(rows))
+            elif progress:
+                print(f"Imported {imported}/{len(rows)} rows ({commits} commits, {time.perf_counter() - start_time:.1f} s).")
+
+        return {"imported": imported, "skipped": skipped, "commits": commits, "seconds": time.perf_counter() - start_time}
+
+    # Whether the element of an import row is already in the model: a part or requirement of the same name anywhere,
+    # an attribute of the same name and value on the row's owner only (the same attribute on another element is a different one)
+    def _import_row_exists(self, row, root_name):
+        if row["type"] != "AttributeUsage":
+            return self._name_exists(row["name"])
+
+        owner = row["owner"] or root_name
+        if owner is None or not self._name_exists(owner):
+            return False
+        attribute_name = _import_element_name(row)
+        return any(self.element_index[child_id]["name"] == attribute_name and self.element_index[child_id]["type"] == "AttributeUsage"
+                   for child_id in self.element_index.children_ids(self._id_by_name(owner)))
+
+    # Orders the rows so that owners come before what they own (Kahn's algorithm over the owner names). Owners that are not rows must already be in the model.
+    def _owners_first(self, rows, root_name):
+        row_by_name = {}
+        for position, row in enumerate(rows):
+            if row["type"] != "AttributeUsage":
+                row_by_name.setdefault(row["name"], position)
+
+        ordered = []
+        owned_rows = {}
+        for position, row in enumerate(rows):
+            owner = row["owner"] or root_name
+            owner_position = row_by_name.get(owner)
+            if owner_position is not None and owner_position != position:
+                owned_rows.setdefault(owner_position, []).append(position)
+            elif owner is not None and self._name_exists(owner):
+                ordered.append(position)
+            else:
+                raise ValueError(f"No owner element of name {owner} was found for row {position + 1} ({row['name']}). Is there some typo?")
+
+        next_position = 0
+        while next_position < len(ordered):
+            ordered.extend(owned_rows.pop(ordered[next_position], ()))
+            next_position += 1
+
+        if owned_rows: # rows that (indirectly) own themselves
+            cycle = sorted(position for positions in owned_rows.values() for position in positions)
+            raise ValueError(f"Rows {', '.join(str(position + 1) for position in cycle[:10])} own each other, so none of them can be created first.")
+        return [rows[position] for position in ordered]
+
+    ### EXPORT ###
+    # Exports the elements, attributes, or requirements (kind) of a commit (id, or index in all_commits; default: the current commit) to a file,
+    # given as a path or a file object (e.g. io.BytesIO for a download), in the format "csv", "jsonl" (JSON Lines), or "parquet". The columns are
+    #   elements:     id, name, type, owner_id, owner_path
+    #   attributes:   id, owner_id, owner_path, attribute, value, numeric, unit (parsed as in attributes_table)
+    #   requirements: id, name, description, owner_id, owner_path
+    # where owner_path is the names of the element's owners from the root, joined by "::" (e.g. "Root Part::Aircraft::Wing").
+    # Rows are written chunk_size at a time. The current commit, and the commits kept in self.history, are exported from memory; any other commit is
+    # streamed from the loader page by page (see iter_elements()) without building its model. root (id of an element, or its name if no other
+    # element has it) exports only it and its descendants, for commits in memory. Returns the number of rows written.
+    def export(self, file, kind="elements", format="csv", commit=None, root=None, chunk_size=ELEMENTS_PAGE_SIZE):
+        commit_id = self.current_commit if commit is None else self._commit_id(commit)
+        element_index = self.element_index if commit_id == self.current_commit else self.history.get(commit_id)
+
+        if root is not None:
+            if element_index is None:
+                raise ValueError(f"Commit {commit_id} is not in memory: select it (select_commit()) to export part of its model.")
+            if root in element_index:
+                root_id = root
+            else:
+                root_ids = element_index.ids_by_name(root)
+                if not root_ids:
+                    raise ValueError(f"No element of name or id {root} was found. Is there some typo?")
+                if len(root_ids) > 1:
+                    raise ValueError(f"{len(root_ids)} elements are named {root}: give the id of the one to export.")
+                root_id = root_ids[0]
+            element_ids = [root_id] + element_index.descendant_ids(root_id)
+            records = [element_index[element_id] for element_id in element_ids]
+            batches = (records[start:start + chunk_size] for start in range(0, len(records), chunk_size))
+        elif element_index is not None:
+            records = list(element_index.values())
+            batches = (records[start:start + chunk_size] for start in range(0, len(records), chunk_size))
+        else:
+            batches = ([_element_record(element) for element in batch]
+                       for batch in iter_elements(self.id, commit_id, page_size=chunk_size, client=self.client, use_cache=self.use_cache))
+
+        return export_records(batches, file, kind, format, element_index)
+
+    ### QUERIES ###
+    # Finds the elements of the current commit matching all the given filters, e.g. project.query(type="PartUsage", ancestor="Engine", where="mass > 10"):
+    #   type:      element type ("PartUsage", "AttributeUsage", "RequirementUsage", ...), or a list of types
+    #   name:      name pattern with wildcards ("Wheel*", "*bolt?"), matched against the whole name
+    #   owner:     name (of one element only) or id of the element's direct owner
+    #   ancestor:  name (of one element only) or id of an element the results are contained in (directly or not)
+    #   max_depth: only elements at most this many levels below the ancestor (below the root elements if no ancestor is given)
+    #   where:     attribute predicate(s) the element must satisfy through the attributes it owns: "mass > 10", "material == steel", "cost" (has a cost)...
+    # Filters are evaluated as column operations over the element tables and the containment index, which are built once per commit;
+    # each filter only runs on the rows left by the previous ones (cheapest and most selective first).
+    # Returns a QueryResult (the matching ids; see QueryResult for their names, records, or a table).
+    def query(self, type=None, name=None, owner=None, ancestor=None, max_depth=None, where=None):
+        df = self._df_elements
+
+        if owner is not None:
+            df = df[df["owner_id"] == self._query_element_id(owner)]
+
+        if ancestor is not None:
+            ancestor_id = self._query_element_id(ancestor)
+            if max_depth is None:
+                df = df[df["id"].isin(self.element_index.descendant_ids(ancestor_id))]
+            else:
+                df = df[df["id"].isin(self._descendant_ids(ancestor_id, max_depth))]
+        elif max_depth is not None:
+            df = df[self._depths()[df.index] <= max_depth]
+
+        if type is not None:
+            df = df[df["type"].isin([type] if isinstance(type, str) else type)]
+
+        for predicate in ([where] if isinstance(where, str) else where or []):
+            df = df[df["id"].isin(self._owners_satisfying(predicate))]
+
+        if name is not None:
+            df = df[df["name"].str.match(fnmatch.translate(name)).fillna(False).astype(bool)]
+
+        return QueryResult(self, df["id"].to_list())
+
+    # ids of the elements contained in the given element, down to max_depth levels below it
+    def _descendant_ids(self, element_id, max_depth):
+        children = self.element_index.children
+        descendant_ids = []
+        level = list(children.get(element_id, ()))
+        for _ in range(max_depth):
+            descendant_ids.extend(level)
+            level = [child_id for parent_id in level for child_id in children.get(parent_id, ())]
+        return descendant_ids
+
+    # The id of an element given by id or by name (ValueError if there is no such element, or if several elements have the name)
+    def _query_element_id(self, element):
+        if element in self.element_index:
+            return element
+        element_ids = self.element_index.ids_by_name(element)
+        if not element_ids:
+            raise ValueError(f"Element {element} does not exist or name has typo.")
+        if len(element_ids) > 1:
+            raise ValueError(f"{len(element_ids)} elements are named {element}: give the id of the one to query.")
+        return element_ids[0]
+
+    # The ids of the elements owning an attribute that satisfies the predicate ("attribute name", or "attribute name <operator> value")
+    def _owners_satisfying(self, predicate):
+        match = _PREDICATE.match(predicate)
+        if match is None:
+            raise ValueError(f"Invalid attribute predicate: {predicate!r}. Use e.g. 'mass > 10', 'material == steel', or 'mass'.")
+        attribute, comparison, value = match.group("attribute", "operator", "value")
+
+        df_values = self._attribute_values().get(attribute)
+        if df_values is None:
+            return []
+
+        if comparison is not None:
+            compare = _COMPARISONS[comparison]
+            value = value.strip("'\"")
+            try:
+                satisfied = compare(df_values["numeric"], float(value))
+            except ValueError: # not a number: compare the values as text
+                if comparison not in ("==", "=", "!="):
+                    raise ValueError(f"Invalid attribute predicate: {predicate!r}. Only == and != compare text values.")
+                satisfied = compare(df_values["value"], value)
+            df_values = df_values[satisfied]
+
+        return df_values["owner_id"].unique()
+
+    ### ROLL-UPS ###
+    # Aggregates the values of an attribute (e.g. "mass") over the containment tree: for every element, the values of the attribute held by the element
+    # itself and by everything it contains (directly or not). agg is "sum", "mean", "min", "max", or "count".
+    # Returns {element id: value} for the elements whose subtree holds at least one numeric value of the attribute.
+    # The partial aggregates (sum, count, min, max) are computed in a single post-order pass and kept per commit; an edit only recomputes the
+    # elements above the changed ones (see _update_rollups()), so asking again after an edit, or for another agg, does not walk the tree again.
+    def rollup(self, attribute, agg="sum"):
+        if agg not in _ROLLUP_AGGREGATES:
+            raise ValueError(f"Unknown aggregate {agg!r}. Use one of: {', '.join(_ROLLUP_AGGREGATES)}.")
+
+        stats = self._rollups.get(attribute)
+        if stats is None:
+            stats = self._rollups[attribute] = self._compute_rollup(attribute)
+
+        aggregate = _ROLLUP_AGGREGATES[agg]
+        return {element_id: aggregate(element_stats) for element_id, element_stats in stats.items()}
+
+    # Partial aggregates (sum, count, min, max) of the attribute for every element, in one post-order pass over the containment index
+    def _compute_rollup(self, attribute):
+        element_index = self.element_index
+
+        df_values = self._attribute_values().get(attribute)
+        own_stats = {}
+        if df_values is not None:
+            df_values = df_values[df_values["numeric"].notna()]
+            grouped = df_values.groupby("owner_id")["numeric"].agg(["sum", "count", "min", "max"])
+            own_stats = dict(zip(grouped.index, grouped.itertuples(index=False, name=None)))
+
+        stats = {}
+        roots = [record["id"] for record in element_index.values() if record["owner_id"] not in element_index]
+        stack = [(root_id, False) for root_id in roots]
+        while stack:
+            element_id, children_done = stack.pop()
+            if not children_done:
+                stack.append((element_id, True))
+                stack.extend((child_id, False) for child_id in element_index.children.get(element_id, ()))
+                continue
+
+            element_stats = own_stats.get(element_id)
+            for child_id in element_index.children.get(element_id, ()):
+                element_stats = _merge_stats(element_stats, stats.get(child_id))
+            if element_stats is not None:
+                stats[element_id] = element_stats
+        return stats
+
+    # After an edit: recomputes the kept roll-ups of the given elements and of all their owners, deepest first, from their own attribute values
+    # and the (already up to date) roll-ups of their children. Elements that no longer exist are dropped.
+    def _update_rollups(self, start_ids):
+        if not self._rollups:
+            return
+        element_index = self.element_index
+
+        depths = {}
+        for start_id in set(start_ids):
+            chain = []
+            element_id = start_id
+            while element_id in element_index and element_id not in chain:
+                chain.append(element_id)
+                element_id = element_index[element_id]["owner_id"]
+            for position, element_id in enumerate(chain):
+                depths[element_id] = max(depths.get(element_id, 0), len(chain) - 1 - position)
+        dirty = sorted(depths, key=depths.get, reverse=True)
+
+        for attribute, stats in self._rollups.items():
+            for element_id in list(stats):
+                if element_id not in element_index:
+                    del stats[element_id]
+
+            for element_id in dirty:
+                element_stats = None
+                for child_id in element_index.children.get(element_id, ()):
+                    child = element_index[child_id]
+                    if child["type"] == "AttributeUsage":
+                        child_attribute, value = _attribute_number(child["name"])
+                        if child_attribute == attribute and value is not None:
+                            element_stats = _merge_stats(element_stats, (value, 1, value, value))
+                    else:
+                        element_stats = _merge_stats(element_stats, stats.get(child_id))
+
+                if element_stats is None:
+                    stats.pop(element_id, None)
+                else:
+                    stats[element_id] = element_stats
+
+    # Returns the id of the (first) element with the given name (IndexError if there is none). Inside a transaction, elements as edited
+    # earlier in it come first: created or renamed ones are found by their new name, and renamed or deleted ones no longer by their old name.
+    def _id_by_name(self, name):
+        if self._transaction is not None:
+            element_id = self._transaction.id_by_name(name)
+            if element_id is not None:
+                return element_id
+            for element_id in self.element_index.ids_by_name(name):
+                if element_id not in self._transaction.records:
+                    return element_id
+            raise IndexError(name)
+        return self.element_index.ids_by_name(name)[0]
+
+    def _name_exists(self, name):
+        try:
+            self._id_by_name(name)
+        except IndexError:
+            return False
+        return True
+
+    # Returns the record of an element (see _element_record()), as queued in the open transaction if it was edited there
+    def _record(self, element_id):
+        if self._transaction is not None and element_id in self._transaction.records:
+            record = self._transaction.records[element_id]
+            if record is None:
+                raise ValueError(f"Element {element_id} is deleted in the open transaction.")
+            return record
+        if element_id not in self.element_index:
+            raise ValueError(f"Element {element_id} does not exist in this project.")
+        return self.element_index[element_id]
+
+    # The ids of the descendants of an element; inside a transaction, as edited in it (created, moved, and deleted elements included)
+    def _descendant_ids(self, element_id):
+        if self._transaction is None:
+            return self.element_index.descendant_ids(element_id)
+
+        records = self._transaction.records
+        queued_children = {}
+        for queued_id, record in records.items():
+            if record is not None:
+                queued_children.setdefault(record["owner_id"], []).append(queued_id)
+
+        descendant_ids = []
+        stack = [element_id]
+        while stack:
+            parent_id = stack.pop()
+            children = [child_id for child_id in self.element_index.children_ids(parent_id) if child_id not in records]
+            children.extend(queued_children.get(parent_id, ()))
+            descendant_ids.extend(children)
+            stack.extend(children)
+        return descendant_ids
+
+    # Returns the id of the owner of the (first) element with the given name (None for a root element)
+    def _owner_id_by_name(self, name):
+        return self._record(self._id_by_name(name))["owner_id"]
+
+    ### TRANSACTIONS ###
+
+    # Groups many edits into a single commit:
+    #   with project.transaction():
+    #       project.create_element("Wing", "Aircraft")
+    #       project.add_attribute("mass", 120, "Wing") # "Wing" is not on the server yet, but can already be used as an owner
+    # Every edit inside the block is queued; when the block ends they are posted as ONE Commit and the model is refreshed (and the tree drawn) once.
+    # If the block raises an exception, nothing is posted. The Transaction can also be used explicitly: transaction().begin(), then commit() or rollback().
+    def transaction(self):
+        return Transaction(self)
+
+    ### INCREMENTAL REFRESH AFTER A COMMIT ###
+
+    # Posts a Commit. If successful, it becomes the current commit and its changes are applied to the in-memory model,
+    # so an edit costs one POST (plus, at most, one small GET of the commit's changes) instead of a full reload of the model.
+    # Returns the posted commit (dict), or None if the server rejected it. Inside a transaction, the changes are queued instead
+    # and the open Transaction is returned.
+    def _post_commit(self, commit_body, error_message="Problem in creating a new commit in this project."):
+        if self._transaction is not None:
+            self._transaction.add(commit_body["change"])
+            return self._transaction
+
+        commit_post_response = self.client.post(f"projects/{self.id}/commits", commit_body)
+
+        if commit_post_response.status_code == 200:
+            commit_response_json = commit_post_response.json()
+            pprint(commit_response_json)
+            self._add_commit(commit_response_json)
+            self._apply_commit(commit_body["change"])
+            return commit_response_json
 
-            node_name_formatted = f"Requirement:\n {node_name}\n {req_desc}"
         else:
-            node_name_formatted = node_name
+            pprint(error_message)
+            pprint(commit_post_response)
+            return None
+
+    # Makes the posted commit the current (and latest) commit and adds it at the top of all_commits
+    def _add_commit(self, commit_json):
+        self.previous_commit = self.current_commit
+        self.current_commit = commit_json['@id']
+        self.latest_commit = self.current_commit
+
+        if "created" in commit_json:
+            df_commit = pd.DataFrame([{'Commit ID': commit_json['@id'], "Commit Created": pd.to_datetime(commit_json['created']),
+                                       "Previous Commit": _previous_commit_id(commit_json)}])
+            self.all_commits = pd.concat([df_commit, self.all_commits], ignore_index=True)
+        else:
+            self._update_commits()
+
+    # Applies the changes of the current commit. The posted changes are used as they are only when every one of them updates or deletes
+    # an element already in the model. A commit that creates elements is read back from the server's changes endpoint (as is every commit
+    # if verify_changes is set), since the server may assign its own @id to new elements, even to those given one by a Transaction.
+    # If that fails too, the model is fully reloaded.
+    def _apply_commit(self, posted_changes):
+        changes = posted_changes
 
-        # If the parent exists, create the node with the parent
-        if parent_name is None or parent_name in self.tree.nodes:
-            # print(f'{node_name}', f'{parent_name}')
-            self.tree.create_node(tag=node_name_formatted, identifier=node_name, parent=parent_name)
+        if self.verify_changes or any(_creates_element(change, self.element_index) for change in posted_changes):
+            try:
+                changes = commit_changes(self.id, self.current_commit, client=self.client)
+            except ValueError:
+                self._update_elements()
+                self._update_tree()
+                return
+
+        self.history.deltas[self.current_commit] = changes
+        self.history.reverse_deltas[self.current_commit] = self.element_index.previous_records(changes)
+        self._apply_changes(changes)
+
+    # Patches the element records, elements_attributes, and the tree with a list of changes (DataVersions). Costs O(changed elements).
+    def _apply_changes(self, changes):
+        rollup_starts = [] # elements whose roll-ups may have changed, along with all their owners (see _update_rollups())
+        for change in changes:
+            element_id = _change_id(change)
+            old = self.element_index.get(element_id)
+            if old is not None:
+                rollup_starts.append(old["owner_id"])
+
+            if old is not None and old["type"] == "AttributeUsage":
+                self._remove_element_attribute(old)
+
+            if change.get("payload") is None: # deleted element
+                if old is not None:
+                    self.element_index.remove(element_id)
+                    self.elements_attributes.pop(old["name"], None)
+                    if element_id in self.tree:
+                        self.tree.remove_node(element_id)
+                continue
+
+            new = _element_record(change["payload"], element_id)
+            self.element_index.add(new)
+            rollup_starts.extend((new["owner_id"], element_id))
+
+            if new["type"] == "AttributeUsage":
+                self._add_element_attribute(new)
+            if old is not None and old["name"] != new["name"] and old["name"] in self.elements_attributes: # renamed owner of attributes
+                self.elements_attributes[new["name"]] = self.elements_attributes.pop(old["name"])
+
+            self._patch_tree_node(old, new)
+
+        self._frames = None
+        self._update_rollups(rollup_starts)
+
+    # Creates, re-tags or moves the tree node of a created or updated element
+    def _patch_tree_node(self, old, new):
+        if new["type"] == "Comment":
+            return
+
+        element_id = new["id"]
+        owner_id = new["owner_id"] if new["owner_id"] in self.tree else None
+        tag = self._node_tag(new["name"], element_id, new["type"])
+
+        if element_id not in self.tree:
+            # a second root cannot be added to the tree
+            if owner_id is not None or self.tree.root is None:
+                self.tree.create_node(tag=tag, identifier=element_id, parent=owner_id)
+            return
+
+        self.tree.update_node(element_id, tag=tag)
+
+        parent = self.tree.parent(element_id)
+        if owner_id is not None and (parent is None or parent.identifier != owner_id):
+            self.tree.move_node(element_id, owner_id)
+
+    ### TREE ####
+
+    # Determine the format of the text in tree. The identifier is the element id; the tag is what is shown.
+    def _node_tag(self, node_name, node_id, type=None):
+        if type == "AttributeUsage":
+            return f"Attribute:\n {node_name}"
+        elif type == "RequirementUsage":
+            req_desc = self.element_index[node_id]["desc"][0]
+            return f"Requirement:\n {node_name}\n {req_desc}"
         else:
-            # Find the parent's information in the dataframe
-            # parent_row = df[df["id"] == df[df["name"] == parent_name].iloc[0]["owner_id"][0]["@id"]]
-            parent_row = df[df["name"] == parent_name]
-            if not parent_row.empty:
-                grandparent_name = None
-                grandparent_id = None
-                # Extract the parent's parent (grandparent) if it exists
-                if parent_row.iloc[0]["owner_id"]:
-                    grandparent_id = parent_row.iloc[0]["owner_id"][0]["@id"]
-                    grandparent_row = df[df["id"] == grandparent_id]
-                    if not grandparent_row.empty:
-                        grandparent_name = grandparent_row.iloc[0]["name"]
-                # Recursively ensure the parent exists
-                self.add_node_with_parents(tree, df, parent_row.iloc[0]["name"], parent_row.iloc[0]["id"], grandparent_name)
-            # Now that the parent is added, create the current node
-            self.tree.create_node(tag=node_name_formatted, identifier=node_name, parent=parent_name)
+            return node_name
 
     # This function is mainly used to generate a tree in dot format for PyGraphviz (visualization purposes)
-    def generate_dot(self, tree):
-        dot_string = "digraph G {\n"
-        for node in tree.all_nodes():
-            dot_string += f'    "{node.identifier}" [label="{node.tag}"];\n'
-            if not node.is_root():
-                parent = tree.parent(node.identifier).identifier
-                # dot_string += f'    "{parent}" -> "{node.identifier} \n - more info here \n - attribute 2 here";\n'
-                dot_string += f'    "{parent}" -> "{node.identifier}";\n'
-        dot_string += "}"
-        return dot_string
+    # Returns the DOT source of the tree (the project's tree if none is given); see write_dot() for root_id and max_depth.
+    def generate_dot(self, tree=None, root_id=None, max_depth=None, labels=None, colors=None):
+        dot_stream = io.StringIO()
+        self.write_dot(dot_stream, root_id, max_depth, tree, labels, colors)
+        return dot_stream.getvalue()
+
+    # Writes the tree in DOT format to stream (anything with a write() method: an open file, io.StringIO, ...) in a single pass over the
+    # nodes, each written with the edge from its parent (parent map: node -> parent). Labels and ids are escaped, so quotes, backslashes,
+    # and line breaks are drawn as they are. Give root_id (an element id) to write only the subtree of that element, and max_depth to stop
+    # that many levels below it (0: only the element); the subtree is then walked from root_id down instead.
+    # labels ({element id: label}) replaces the labels of the given nodes (e.g. to show roll-ups, see render_tree()),
+    # and colors ({element id: Graphviz color}) fills the given nodes with a color (e.g. to highlight changes).
+    def write_dot(self, stream, root_id=None, max_depth=None, tree=None, labels=None, colors=None):
+        tree = self.tree if tree is None else tree
+        tree_id = tree.identifier
+
+        if root_id is None and max_depth is None:
+            nodes = ((node_id, node, node.predecessor(tree_id)) for node_id, node in tree.nodes.items())
+        else:
+            root_id = tree.root if root_id is None else root_id
+            if root_id not in tree:
+                raise ValueError(f"Element {root_id} is not in the tree.")
+            nodes = _subtree_nodes(tree, root_id, max_depth)
+
+        stream.write("digraph G {\n")
+        lines = []
+        for node_id, node, parent_id in nodes:
+            identifier = _dot_escape(node_id)
+            label = node.tag if labels is None else labels.get(node_id, node.tag)
+            color = None if colors is None else colors.get(node_id)
+            if color is None:
+                lines.append(f'    "{identifier}" [label="{_dot_escape(label)}"];\n')
+            else:
+                lines.append(f'    "{identifier}" [label="{_dot_escape(label)}", style="filled", fillcolor="{_dot_escape(color)}"];\n')
+            if parent_id is not None:
+                lines.append(f'    "{_dot_escape(parent_id)}" -> "{identifier}";\n')
+
+            if len(lines) >= 4096: # written in chunks: few write() calls, and never more than a chunk held in memory
+                stream.write("".join(lines))
+                lines.clear()
+        stream.write("".join(lines))
+        stream.write("}")
 
     # Updates the tree every time the model is modified, that is, an element (part, attribute, or requirement) is created, updated, or deleted.
+    # (Re)builds the tree from the elements already loaded by _load_elements(), so it never downloads the elements again.
+    # After an edit the tree is patched by _apply_changes() instead.
+    # The tree is only drawn when an image is requested (see render_tree()).
     def _update_tree(self):
-        elements_url = f"{host}/projects/{self.id}/commits/{self.current_commit}/elements" 
-        response = requests.get(elements_url)
-        
-        if response.status_code == 200:
-            elements_data = response.json() #type is LIST
-            
-            df_elements = pd.DataFrame([{"name": element["name"], "id": element["@id"], "type": element["@type"], "owner_id": element["ownedElement"]} for element in elements_data])
-
-            self._df_elements_not_comment = df_elements[df_elements["type"]!="Comment"]
-
-        for index, element in self._df_elements_not_comment.iterrows():
-            node_name = element["name"]
-            node_id = element["id"]
-            parent_name = None
-            node_type = element["type"]
-            # Extract parent_name from owner_id if available
-            if element["owner_id"]:
-                parent_id = element["owner_id"][0]["@id"]
-                parent_row = self._df_elements_not_comment[self._df_elements_not_comment["id"] == parent_id]
-                if not parent_row.empty:
-                    parent_name = parent_row.iloc[0]["name"]
-            # Add the node and its parents
-            self.add_node_with_parents(self.tree, self._df_elements_not_comment, node_name, node_id, parent_name, node_type)
-        
-        dot = self.generate_dot(self.tree)
-        # Visualize with pygraphviz
-        G = pgv.AGraph(string=dot)
-        G.layout(prog='dot')
-        G.draw('tree.png')  # Saves as tree.png
+        self._build_tree()
+
+    # Builds the containment tree in O(n): the tree is filled from the root down through the owner -> children index,
+    # so every parent is created before its children. Nodes are identified by element id, so elements with the same name do not collide.
+    def _build_tree(self):
+        self.tree = Tree()
+
+        element_index = self.element_index
+
+        # root elements: no owner, or an owner that is not in the model (or is a Comment, which is not shown)
+        roots = []
+        for element_id, record in element_index.by_id.items():
+            if record["type"] == "Comment":
+                continue
+            owner = element_index.get(record["owner_id"])
+            if owner is None or owner["type"] == "Comment":
+                roots.append(element_id)
+
+        if not roots:
+            return
+
+        # Treelib can only have 1 root element, so elements left without an owner (orphans) cannot be shown
+        if len(roots) > 1:
+            print(f"{len(roots) - 1} elements other than {element_index[roots[0]]['name']} have no owner and are left out of the tree.")
+
+        stack = [(roots[0], None)]
+        while stack:
+            element_id, parent_id = stack.pop()
+            record = element_index[element_id]
+            self.tree.create_node(tag=self._node_tag(record["name"], element_id, record["type"]), identifier=element_id, parent=parent_id)
+            stack.extend((child_id, element_id) for child_id in reversed(element_index.children_ids(element_id))
+                         if element_index[child_id]["type"] != "Comment")
+
+    # Draws the tree with Graphviz and returns the image (bytes) in the given format ("png", "svg", ...), laid out with prog ("dot", "twopi", ...).
+    # Nothing is drawn when the project is loaded or edited; the layout is only run here, and the result is cached per
+    # (host, project, commit, format, prog), so looking at the same commit again never re-runs Graphviz.
+    # If path is given, the image is also saved there (e.g. path="tree.png"). root_id and max_depth draw only part of the tree (see write_dot()).
+    # rollup=(attribute, agg), e.g. ("mass", "sum"), adds the roll-up of the attribute (see rollup()) to the label of every element that has one.
+    # diff_with (a commit id) highlights the elements added (green) or changed (yellow) since that commit (see diff()).
+    def render_tree(self, format="png", prog="dot", path=None, root_id=None, max_depth=None, rollup=None, diff_with=None):
+        key = (self.client.host, self.id, self.current_commit, format, prog, root_id, max_depth, rollup, diff_with)
+
+        image = _render_cache_get(key)
+        if image is None:
+            # Visualize with pygraphviz, imported here so that scripts which never draw the tree do not need Graphviz installed
+            import pygraphviz as pgv
+            labels = None
+            if rollup is not None:
+                attribute, agg = rollup
+                labels = {element_id: f"{self.tree[element_id].tag}\n{attribute} ({agg}): {value:g}"
+                          for element_id, value in self.rollup(attribute, agg).items() if element_id in self.tree}
+            colors = None
+            if diff_with is not None:
+                diff = self.diff(diff_with)
+                colors = {element_id: DIFF_COLORS["added"] for element_id in diff.added}
+                colors.update((element_id, DIFF_COLORS["changed"]) for element_id in diff.renamed + diff.reowned + diff.modified)
+            G = pgv.AGraph(string=self.generate_dot(root_id=root_id, max_depth=max_depth, labels=labels, colors=colors))
+            G.layout(prog=prog)
+            image = G.draw(format=format)
+            _render_cache_put(key, image)
+
+        if path is not None:
+            with open(path, "wb") as file:
+                file.write(image)
+        return image
+
+    ### DIFF ###
+    # Compares two commits of the project (given by id, or by index in all_commits); commit_b defaults to the current commit and
+    # commit_a to the commit before commit_b. Returns a ModelDiff of the elements added, removed, renamed, re-owned, and modified.
+    # Elements are compared through a small entry per element (name, owner, type, and a hash of the rest).
+    # When commit_b directly follows commit_a, only the elements in commit_b's changes are compared, with their previous versions
+    # (see _previous_records()). Otherwise, or if commit_b changed too many elements, the snapshots of both commits are compared
+    # (see _snapshot(), which rebuilds them from the commits at hand where it can).
+    def diff(self, commit_a=None, commit_b=None):
+        commit_b = self.current_commit if commit_b is None else self._commit_id(commit_b)
+        commit_a = self._previous_commit_of(commit_b) if commit_a is None else self._commit_id(commit_a)
+        if commit_a is None:
+            raise ValueError(f"Commit {commit_b} has no previous commit to compare with.")
+
+        diff = self._diffs.get((commit_a, commit_b))
+        if diff is None:
+            diff = self._diffs[(commit_a, commit_b)] = self._compute_diff(commit_a, commit_b)
+        return diff
+
+    def _compute_diff(self, commit_a, commit_b):
+        if self._previous_commit_of(commit_b) == commit_a:
+            try:
+                previous_records = self._previous_records(commit_b)
+            except ValueError:
+                previous_records = None
+            if previous_records is not None:
+                return self._diff_changes(commit_a, commit_b, self._commit_delta(commit_b), previous_records)
+
+        return ModelDiff(commit_a, commit_b, self._diff_entries(commit_a), self._diff_entries(commit_b))
+
+    # Diff of a commit with its previous commit, from its changes and the previous records of the changed elements
+    def _diff_changes(self, commit_a, commit_b, changes, previous_records):
+        entries_b = {}
+        for change in changes:
+            element_id = _change_id(change)
+            if change.get("payload") is not None:
+                entries_b[element_id] = _diff_entry(_element_record(change["payload"], element_id))
+            else:
+                entries_b.pop(element_id, None)
+
+        entries_a = {element_id: _diff_entry(record) for element_id, record in previous_records.items() if record is not None}
+        return ModelDiff(commit_a, commit_b, entries_a, entries_b)
+
+    # Diff entries of every element of a commit
+    def _diff_entries(self, commit_id):
+        return {element_id: _diff_entry(record) for element_id, record in self._snapshot(commit_id).by_id.items()}
+
+    # The id of a commit given by id or by index in all_commits
+    def _commit_id(self, commit):
+        if isinstance(commit, numbers.Integral): # also numpy integers, e.g. read from all_commits
+            return self.all_commits.iloc[commit]["Commit ID"]
+        return commit
+
+    def _previous_commit_of(self, commit_id):
+        previous_commits = self.all_commits.loc[self.all_commits["Commit ID"] == commit_id, "Previous Commit"]
+        return previous_commits.iloc[0] if len(previous_commits) > 0 and pd.notna(previous_commits.iloc[0]) else None
 
     ### COMMITS ###
-    # Select using the commit index or id the commit you want to be working in
+    # Select using the commit index or id the commit you want to be working in. Its elements are loaded (all_elements, the tree, ...),
+    # rebuilt from the commits already shown where possible (see _snapshot()), so going back and forth in the history is fast.
+    # Edits made afterwards are committed on top of the selected commit.
     def select_commit(self, index=None, id=None):
         if index != None: # given index of desired commit in self.all_commits, set the current commit
             try:
-                self.current_commit = self.all_commits.iloc[index, 0]
+                commit_id = self.all_commits.iloc[index, 0]
             except:
-                ValueError("Index does not exist or is out of range.")
+                raise ValueError("Index does not exist or is out of range.")
 
         elif id != None: # given id of desired commit in self.all_commits, set the current commit
-            self.current_commit = self.id
+            if id not in set(self.all_commits["Commit ID"]):
+                raise ValueError("Commit ID does not exist in this project or has typo.")
+            commit_id = id
+
+        else:
+            return
+
+        if commit_id == self.current_commit:
+            return
+
+        element_index = self._snapshot(commit_id).copy() # the project's own copy, since edits modify it
+        self.history.put(self.current_commit, self.element_index)
+        self.current_commit = commit_id
+        self._set_element_index(element_index)
+        self._update_tree()
 
     # Select the most recent commit as your current commit
     def select_most_recent_commit(self):
-        self.current_commit = self.latest_commit
+        self.select_commit(id=self.latest_commit)
+
+    # Returns a separate Project showing the given commit (id, or index in all_commits), leaving this one as it is, e.g. for several people
+    # browsing the history of a shared project. It shares this project's client and history (see CommitSnapshots).
+    def at_commit(self, commit):
+        commit_id = self._commit_id(commit)
+        if commit_id not in set(self.all_commits["Commit ID"]):
+            raise ValueError("Commit ID does not exist in this project or has typo.")
+
+        view = Project.__new__(type(self))
+        view._setup(self.name, self.id, self.index, self.client, self.page_size, self.verify_changes, self.use_cache)
+        view.history = self.history
+        view.all_commits = self.all_commits
+        view.latest_commit = self.latest_commit
+        view.current_commit = commit_id
+        view._set_element_index(self._snapshot(commit_id).copy())
+        view._update_tree()
+        return view
+
+    # The elements of a commit as an ElementIndex (shared with the history: do not modify it), built from the cheapest commit at hand:
+    #   - an older one (the current commit, a kept snapshot, a commit in the on-disk element cache, or the first commit), to which the changes
+    #     of the commits in between are applied (one request per commit, the first time); a snapshot is kept every SNAPSHOT_INTERVAL commits
+    #   - or a newer one (the current commit or a kept snapshot), from which the commits in between are undone (see _previous_records()),
+    #     e.g. when stepping back from the latest commit
+    # If there is none within MAX_DELTA_CHAIN commits, the commit is loaded whole.
+    def _snapshot(self, commit_id):
+        snapshot = self._snapshot_at_hand(commit_id)
+        if snapshot is not None:
+            return snapshot
+
+        base_commit, older_chain = self._older_chain(commit_id)
+        newer_chain = self._newer_chain(commit_id)
+
+        # commits whose changes (or reverse changes) are not known yet cost a request each, as does loading a base
+        older_cost = sum(chain_commit not in self.history.deltas for chain_commit in older_chain) + (self._snapshot_at_hand(base_commit) is None)
+        if newer_chain is not None and sum(chain_commit not in self.history.reverse_deltas for chain_commit in newer_chain[:-1]) <= older_cost:
+            snapshot = self._snapshot_from_newer(newer_chain)
+        if snapshot is None:
+            snapshot = self._snapshot_from_older(commit_id, base_commit, older_chain)
+
+        self.history.put(commit_id, snapshot)
+        return snapshot
+
+    # The elements of a commit if they are in memory (current commit or kept snapshot), else None
+    def _snapshot_at_hand(self, commit_id):
+        if commit_id == self.current_commit:
+            return self.element_index
+        return self.history.get(commit_id)
+
+    # Returns (base commit, commits after it up to commit_id, newest first): the nearest older commit to build commit_id from.
+    # The base is commit_id itself, with no commits in between, when commit_id has to be loaded whole.
+    def _older_chain(self, commit_id):
+        previous_commits = dict(zip(self.all_commits["Commit ID"], self.all_commits["Previous Commit"]))
+        cache = element_cache if self.use_cache else None
+
+        chain = []
+        base_commit = commit_id
+        while True:
+            if base_commit == self.current_commit or base_commit in self.history:
+                return base_commit, chain
+            if len(chain) >= MAX_DELTA_CHAIN: # too far from any commit at hand: the commit itself is loaded
+                return commit_id, []
+            if pd.isna(previous_commits.get(base_commit)) or (cache is not None and cache.contains(self.client.host, self.id, base_commit)):
+                return base_commit, chain # first commit of the project (usually tiny), or already on disk
+            chain.append(base_commit)
+            base_commit = previous_commits[base_commit]
+
+    # Returns the commits from the nearest newer commit at hand down to commit_id (each one made on top of the next), or None if there is none
+    # within MAX_DELTA_CHAIN commits
+    def _newer_chain(self, commit_id):
+        next_commits = {}
+        for next_commit, previous_commit in zip(self.all_commits["Commit ID"], self.all_commits["Previous Commit"]):
+            if pd.notna(previous_commit):
+                next_commits.setdefault(previous_commit, []).append(next_commit)
+
+        came_from = {commit_id: None}
+        level = [commit_id]
+        for _ in range(MAX_DELTA_CHAIN):
+            next_level = []
+            for chain_commit in level:
+                for next_commit in next_commits.get(chain_commit, ()):
+                    if next_commit in came_from:
+                        continue
+                    came_from[next_commit] = chain_commit
+                    if next_commit == self.current_commit or next_commit in self.history:
+                        chain = [next_commit]
+                        while chain[-1] != commit_id:
+                            chain.append(came_from[chain[-1]])
+                        return chain
+                    next_level.append(next_commit)
+            level = next_level
+        return None
+
+    def _snapshot_from_older(self, commit_id, base_commit, chain):
+        base = self._snapshot_at_hand(base_commit)
+        if base is not None:
+            base = base.copy()
+        else:
+            base = self._load_snapshot(base_commit)
+            if chain:
+                self.history.put(base_commit, base) # kept as a starting point for the next commits shown
+                base = base.copy()
+
+        for position, chain_commit in enumerate(reversed(chain), 1):
+            self.history.reverse_deltas.setdefault(chain_commit, base.apply_changes(self._commit_delta(chain_commit)))
+            if position % SNAPSHOT_INTERVAL == 0 and chain_commit != commit_id:
+                self.history.put(chain_commit, base.copy())
+        return base
+
+    # Undoes the commits of the chain (see _newer_chain()) from the newer commit at hand; None if one of them cannot be undone cheaply
+    def _snapshot_from_newer(self, chain):
+        undo = []
+        for chain_commit in chain[:-1]:
+            previous_records = self._previous_records(chain_commit)
+            if previous_records is None:
+                return None
+            undo.append(previous_records)
+
+        base = self._snapshot_at_hand(chain[0])
+        if base is None: # dropped from the history meanwhile
+            return None
+        base = base.copy()
+        for previous_records in undo:
+            base.restore(previous_records)
+        return base
+
+    # The records that the elements changed by a commit had in its previous commit (None for the elements it created), which undo it
+    # (see ElementIndex.restore()). Known once the commit has been applied; otherwise read from the previous commit if it is in memory,
+    # or else requested element by element, in parallel. Returns None if the commit changed more than DIFF_CHANGES_LIMIT elements.
+    def _previous_records(self, commit_id):
+        previous_records = self.history.reverse_deltas.get(commit_id)
+        if previous_records is not None:
+            return previous_records
+
+        changes = self._commit_delta(commit_id)
+        previous_commit = self._previous_commit_of(commit_id)
+        previous_snapshot = self._snapshot_at_hand(previous_commit) if previous_commit is not None else ElementIndex()
+
+        if previous_snapshot is not None:
+            previous_records = previous_snapshot.previous_records(changes)
+        else:
+            element_ids = list(OrderedDict.fromkeys(_change_id(change) for change in changes))
+            if len(element_ids) > DIFF_CHANGES_LIMIT:
+                return None
+
+            def previous_record(element_id):
+                element = commit_element(self.id, previous_commit, element_id, self.client)
+                return None if element is None else _element_record(element, element_id)
+
+            with ThreadPoolExecutor(max_workers=max(1, min(PREVIOUS_RECORDS_WORKERS, len(element_ids)))) as pool:
+                previous_records = dict(zip(element_ids, pool.map(previous_record, element_ids)))
+
+        self.history.reverse_deltas[commit_id] = previous_records
+        return previous_records
+
+    # The elements of a commit as a new ElementIndex, loaded through iter_elements()
+    def _load_snapshot(self, commit_id):
+        element_index = ElementIndex()
+        for batch in iter_elements(self.id, commit_id, page_size=self.page_size, client=self.client, use_cache=self.use_cache):
+            for element in batch:
+                element_index.add(_element_record(element))
+        return element_index
+
+    # The changes of a commit (from its previous commit), requested once
+    def _commit_delta(self, commit_id):
+        changes = self.history.deltas.get(commit_id)
+        if changes is None:
+            changes = self.history.deltas[commit_id] = commit_changes(self.id, commit_id, client=self.client)
+        return changes
+
+    # Reloads the project if its server has commits that it does not know of (e.g. made by someone else since it was loaded).
+    # Costs a single commits request when nothing changed. Returns True if the project was reloaded.
+    def refresh(self):
+        commits_response = self.client.get(f"projects/{self.id}/commits")
+
+        if commits_response.status_code != 200:
+            raise ValueError(f"Status Code: {commits_response.status_code}. Problem in fetching commits.")
+
+        commits = commits_response.json()
+        known_commits = set(self.all_commits["Commit ID"])
+        if all(commit["@id"] in known_commits for commit in commits):
+            return False
+
+        self._set_commits(commits)
+        self._load_elements(self._fetch_elements())
+        self._update_tree()
+        return True
+
+
+
+
+
+
+
+# Transaction - the changes of several edits of a Project, posted together as a single Commit (see Project.transaction()).
+# It keeps a record of each element as queued, so later edits in the transaction find elements by their new names and read their new owners.
+class Transaction:
+
+    def __init__(self, project):
+        self.project = project
+        self.changes = []
+        self.created = {} # name -> @id of each element created in this transaction
+        self.records = {} # @id -> record (see _element_record()) of each element edited in this transaction, None once deleted
+        self.result = None # the posted commit (dict), once committed
+        self._positions = {} # @id -> position in self.changes, so a second edit of the same element replaces the first
+        self._created_positions = set()
+        self._ids_by_name = {} # name -> {@id: None} of the queued records
+
+    # Queues changes (DataVersions). New elements get their @id here, so that later edits in the transaction can reference them.
+    def add(self, changes):
+        for change in changes:
+            element_id = _change_id(change)
+
+            if element_id is None:
+                element_id = str(uuid.uuid4())
+                change["identity"] = {"@id": element_id}
+                self.created[change["payload"]["name"]] = element_id
+                self._created_positions.add(len(self.changes))
+
+            if element_id in self._positions:
+                position = self._positions[element_id]
+                if change.get("payload") is None and position in self._created_positions: # created and deleted in the same transaction
+                    self.changes[position] = None
+                    self.created = {name: id for name, id in self.created.items() if id != element_id}
+                    del self._positions[element_id]
+                    self._set_record(element_id, None)
+                    del self.records[element_id]
+                else:
+                    self.changes[position] = change
+                    self._set_record(element_id, change)
+                continue
+
+            self._positions[element_id] = len(self.changes)
+            self.changes.append(change)
+            self._set_record(element_id, change)
+
+    # The id of the (latest) element queued under the given name, or None
+    def id_by_name(self, name):
+        ids = self._ids_by_name.get(name)
+        return next(reversed(ids)) if ids else None
+
+    def _set_record(self, element_id, change):
+        record = self.records.get(element_id)
+        if record is not None:
+            _discard(self._ids_by_name, record["name"], element_id)
+
+        record = None if change is None or change.get("payload") is None else _element_record(change["payload"], element_id)
+        self.records[element_id] = record
+        if record is not None:
+            self._ids_by_name.setdefault(record["name"], {})[element_id] = None
+
+    # Posts all queued changes as one Commit. Returns the posted commit (dict), or None if there was nothing to post or the server rejected it.
+    def commit(self):
+        self._close()
+        changes = [change for change in self.changes if change is not None]
+        if changes:
+            commit_body = {
+            "@type": "Commit",
+            "change": changes,
+            "previousCommit": {
+                "@id": self.project.current_commit
+            }
+            }
+            self.result = self.project._post_commit(commit_body, f"Problem in posting the {len(changes)} changes of the transaction.")
+        return self.result
+
+    # Drops all queued changes
+    def rollback(self):
+        self._close()
+        self.changes = []
+        self.created = {}
+        self.records = {}
+        self._positions = {}
+        self._created_positions = set()
+        self._ids_by_name = {}
+
+    # Starts queueing the edits of the project (done automatically by the with statement)
+    def begin(self):
+        if self.project._transaction is not None:
+            raise ValueError("A transaction is already open in this project.")
+        self.project._transaction = self
+        return self
+
+    def _close(self):
+        if self.project._transaction is self:
+            self.project._transaction = None
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+########## TREE RENDER CACHE ##########
+
+# Rendered tree images, keyed by (host, project id, commit id, and the arguments of render_tree()). Commits are immutable, so an image never goes stale;
+# only the least recently used images are dropped once there are more than RENDER_CACHE_SIZE of them.
+RENDER_CACHE_SIZE = 32
+_render_cache = OrderedDict()
+_render_cache_lock = threading.Lock()
+
+def _render_cache_get(key):
+    with _render_cache_lock:
+        image = _render_cache.get(key)
+        if image is not None:
+            _render_cache.move_to_end(key)
+        return image
 
+def _render_cache_put(key, image):
+    with _render_cache_lock:
+        _render_cache[key] = image
+        _render_cache.move_to_end(key)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
 
 
+########## DOT ##########
 
+# Yields (node id, node, parent id) for the nodes of the subtree of root_id, down to max_depth levels below it (all levels if None).
+# The parent of root_id is left out, so the subtree is drawn on its own.
+def _subtree_nodes(tree, root_id, max_depth=None):
+    stack = [(root_id, None, 0)]
+    while stack:
+        node_id, parent_id, depth = stack.pop()
+        node = tree.nodes[node_id]
+        yield node_id, node, parent_id
 
+        if max_depth is None or depth < max_depth:
+            stack.extend((child_id, node_id, depth + 1) for child_id in reversed(node.successors(tree.identifier)))
+
+# Escapes text for a double-quoted DOT string: backslashes and quotes are escaped, and line breaks become "\n" (a centered line break)
+def _dot_escape(text):
+    text = str(text)
+    if "\\" in text or '"' in text or "\n" in text or "\r" in text:
+        return text.replace("\\", "\\\\").replace('"', '\\"').replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", "\\n")
+    return text
 
 
 ########## OUTSIDE PROJECT CLASS ##########   
 
 # #### NEW PROJECT ####
 # # New projects have no commits, so created this so the code doesnt try to find them 
-def new_project(project_name, project_description='', repeat=False): 
+def new_project(project_name, project_description='', repeat=False, client=None): 
     
+    client = client or get_client()
+
     # TODO: If a project with the same name already exists, ask for the repeat argument  
 
     project_name = f"{project_name}"
@@ -1196,11 +2723,7 @@ def new_project(project_name, project_description='', repeat=False):
     "description": f"{project_description}"
     }
 
-    project_post_url = f"{host}/projects" 
-
-    project_post_response = requests.post(project_post_url, 
-                                        headers={"Content-Type": "application/json"}, 
-                                        data=json.dumps(project_data))
+    project_post_response = client.post("projects", project_data)
 
     project_id = ""
 
@@ -1248,11 +2771,7 @@ def new_project(project_name, project_description='', repeat=False):
             ]
             }
 
-        commit_post_url = f"{host}/projects/{id}/commits" 
-
-        commit_post_response = requests.post(commit_post_url, 
-                                            headers={"Content-Type": "application/json"}, 
-                                            data=json.dumps(commit_body))
+        commit_post_response = client.post(f"projects/{id}/commits", commit_body)
 
         commit1_id = ""
 
@@ -1266,3 +2785,431 @@ def new_project(project_name, project_description='', repeat=False):
     else:
         pprint(f"Problem in creating the new project.")
         pprint(project_post_response)
+
+
+
+# Read Import Table - reads a table of elements to import (see Project.import_model()) from a CSV, Excel (.xlsx), or JSON (.json, .jsonl) file.
+# source is a path or a file object; the format is taken from the file name unless given ("csv", "excel", "json", "jsonl").
+def read_import_table(source, format=None, sheet_name=0):
+    if format is None:
+        file_name = source if isinstance(source, str) else getattr(source, "name", "")
+        extension = os.path.splitext(str(file_name))[1].lower()
+        format = {".csv": "csv", ".xlsx": "excel", ".json": "json", ".jsonl": "jsonl"}.get(extension)
+        if format is None:
+            raise ValueError(f"Unknown file format of {file_name!r}. Give format='csv', 'excel', 'json', or 'jsonl'.")
+
+    if format == "csv":
+        return pd.read_csv(source, dtype=str, keep_default_na=False)
+    elif format == "excel":
+        return pd.read_excel(source, sheet_name=sheet_name, dtype=str).fillna("")
+    elif format in ("json", "jsonl"):
+        return pd.read_json(source, lines=format == "jsonl", dtype=False)
+    else:
+        raise ValueError(f"Unknown file format {format!r}. Use 'csv', 'excel', 'json', or 'jsonl'.")
+
+_IMPORT_TYPES = {"part": "PartUsage", "partusage": "PartUsage", "attribute": "AttributeUsage", "attributeusage": "AttributeUsage",
+                 "requirement": "RequirementUsage", "requirementusage": "RequirementUsage"}
+
+# The name of the element created for an import row (as add_attribute() names attributes)
+def _import_element_name(row):
+    return f"{row['name']}: {row['value']}" if row["type"] == "AttributeUsage" else row["name"]
+
+# The rows of an import source as dicts of name, type (PartUsage, AttributeUsage, or RequirementUsage), owner, value, and description
+def _import_rows(source, format=None, sheet_name=0):
+    if isinstance(source, pd.DataFrame):
+        df_rows = source
+    elif isinstance(source, list):
+        df_rows = pd.DataFrame(source)
+    else:
+        df_rows = read_import_table(source, format, sheet_name)
+
+    df_rows = df_rows.rename(columns=lambda column: str(column).strip().lower()).rename(columns={"desc": "description"})
+    if "name" not in df_rows.columns:
+        raise ValueError("The table to import needs a 'name' column.")
+
+    def column(name):
+        if name not in df_rows.columns:
+            return [None] * len(df_rows)
+        return [None if pd.isna(value) or str(value).strip() == "" else str(value).strip() for value in df_rows[name]]
+
+    rows = []
+    for position, (name, type, owner, value, description) in enumerate(zip(column("name"), column("type"), column("owner"), column("value"), column("description"))):
+        element_type = _IMPORT_TYPES.get((type or "part").lower())
+        if name is None or element_type is None:
+            raise ValueError(f"Row {position + 1}: {'no name' if name is None else f'unknown type {type!r}'}.")
+        if element_type == "AttributeUsage" and value is None:
+            raise ValueError(f"Row {position + 1}: attribute {name} has no value.")
+        rows.append({"name": name, "type": element_type, "owner": owner, "value": value, "description": description or ""})
+    return rows
+
+
+# Columns of each kind of export (see Project.export()), with their Parquet types
+EXPORT_COLUMNS = {
+    "elements": {"id": "string", "name": "string", "type": "string", "owner_id": "string", "owner_path": "string"},
+    "attributes": {"id": "string", "owner_id": "string", "owner_path": "string", "attribute": "string", "value": "string", "numeric": "float64", "unit": "string"},
+    "requirements": {"id": "string", "name": "string", "description": "string", "owner_id": "string", "owner_path": "string"},
+}
+_EXPORT_TYPES = {"attributes": "AttributeUsage", "requirements": "RequirementUsage"}
+
+# Export Records - writes element records (batches of _element_record() dicts) to a file as in Project.export(), one chunk per batch.
+# element_index, if given, holds every element and is used to find the owner paths; otherwise they are learnt from the batches themselves,
+# keeping only the name and owner of each element, and an element is held back until its owners have been seen. Returns the number of rows written.
+def export_records(batches, file, kind="elements", format="csv", element_index=None):
+    if kind not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown export kind {kind!r}. Use 'elements', 'attributes', or 'requirements'.")
+
+    owner_paths = _OwnerPaths(element_index)
+    waiting = {} # id of an owner not seen yet -> records waiting for it
+    writer = _ExportWriter(file, format, EXPORT_COLUMNS[kind])
+    try:
+        for batch in batches:
+            owner_paths.add(batch)
+            records = [record for record in batch if kind not in _EXPORT_TYPES or record["type"] == _EXPORT_TYPES[kind]]
+            records.extend(child for record in batch for child in waiting.pop(record["id"], ()))
+
+            rows = []
+            for record in records:
+                owner_path, missing_id = owner_paths.owner_path(record)
+                if missing_id is not None:
+                    waiting.setdefault(missing_id, []).append(record)
+                else:
+                    rows.append((record, owner_path))
+            writer.write(_export_frame(kind, rows))
+
+        # owners that never came (e.g. deleted): the path starts below them
+        leftover = [record for waiting_records in waiting.values() for record in waiting_records]
+        if leftover:
+            writer.write(_export_frame(kind, [(record, owner_paths.owner_path(record, partial=True)[0]) for record in leftover]))
+    finally:
+        writer.close()
+    return writer.n_rows
+
+# The rows of an export chunk (list of (record, owner path)) as a DataFrame with the columns of the kind
+def _export_frame(kind, rows):
+    if kind == "attributes":
+        df_rows = pd.DataFrame([(record["id"], record["owner_id"], owner_path, record["name"]) for record, owner_path in rows],
+                               columns=["id", "owner_id", "owner_path", "name"], dtype=object)
+        df_rows = pd.concat([df_rows.drop(columns="name"), _parse_attribute_names(df_rows["name"].astype(str))], axis=1)
+    elif kind == "requirements":
+        df_rows = pd.DataFrame([(record["id"], record["name"], _description(record), record["owner_id"], owner_path) for record, owner_path in rows],
+                               dtype=object)
+    else:
+        df_rows = pd.DataFrame([(record["id"], record["name"], record["type"], record["owner_id"], owner_path) for record, owner_path in rows],
+                               dtype=object)
+    return df_rows.set_axis(list(EXPORT_COLUMNS[kind]), axis=1) if len(df_rows.columns) else pd.DataFrame(columns=list(EXPORT_COLUMNS[kind]))
+
+# The description of a requirement (the element's "text", a list of strings)
+def _description(record):
+    text = record["desc"]
+    if isinstance(text, list):
+        return "\n".join(map(str, text))
+    return text
+
+# _OwnerPaths - the owner paths ("Root Part::Aircraft::Wing") of exported elements, with the path of every owner computed once
+class _OwnerPaths:
+
+    def __init__(self, element_index=None):
+        self.element_index = element_index
+        self.owners = {} # id -> (name, owner id) of the elements seen, if there is no element index
+        self.paths = {} # id of an owner -> its path, including its own name
+
+    def add(self, records):
+        if self.element_index is None:
+            for record in records:
+                self.owners[record["id"]] = (record["name"], record["owner_id"])
+
+    def _owner(self, element_id):
+        if self.element_index is None:
+            return self.owners.get(element_id)
+        record = self.element_index.get(element_id)
+        return None if record is None else (record["name"], record["owner_id"])
+
+    # Returns (owner path of the record, None), or (None, id of the first owner not seen yet). If partial, the path starts below that owner instead.
+    def owner_path(self, record, partial=False):
+        chain = [] # (id, name) of the owners whose path is not known yet, from the nearest
+        owner_id = record["owner_id"]
+        while owner_id is not None and owner_id not in self.paths:
+            owner = self._owner(owner_id)
+            if owner is None:
+                if not partial:
+                    return None, owner_id
+                break
+            if any(owner_id == chain_id for chain_id, _ in chain): # ownership loop in a broken model
+                break
+            chain.append((owner_id, owner[0]))
+            owner_id = owner[1]
+
+        path = self.paths.get(owner_id, "")
+        for chain_id, name in reversed(chain):
+            path = f"{path}::{name}" if path else str(name)
+            self.paths[chain_id] = path
+        return path, None
+
+# _ExportWriter - writes the chunks (DataFrames) of an export to a path or file object as CSV, JSON Lines, or Parquet
+class _ExportWriter:
+
+    def __init__(self, file, format, columns):
+        if format not in ("csv", "jsonl", "parquet"):
+            raise ValueError(f"Unknown export format {format!r}. Use 'csv', 'jsonl', or 'parquet'.")
+        self.format = format
+        self.columns = columns
+        self.n_rows = 0
+        self._parquet_writer = None
+        self._header = True
+
+        self._owns_file = isinstance(file, (str, os.PathLike))
+        self.file = open(file, "wb") if self._owns_file else file
+        self._text = isinstance(self.file, io.TextIOBase)
+        if self._text and format == "parquet":
+            raise ValueError("Parquet is a binary format: give a path or a binary file object.")
+
+        if format == "parquet":
+            # imported here so that scripts which never export to Parquet do not need pyarrow
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._schema = pa.schema([(column, pa.string() if type == "string" else pa.float64()) for column, type in columns.items()])
+            self._parquet_writer = pq.ParquetWriter(self.file, self._schema)
+
+    def write(self, df_rows):
+        if self.format == "parquet":
+            if len(df_rows) > 0:
+                import pyarrow as pa
+                self._parquet_writer.write_table(pa.Table.from_pandas(df_rows, schema=self._schema, preserve_index=False))
+        elif self.format == "csv":
+            if len(df_rows) > 0 or self._header:
+                self._write_text(df_rows.to_csv(index=False, header=self._header))
+                self._header = False
+        elif len(df_rows) > 0:
+            text = df_rows.to_json(orient="records", lines=True, force_ascii=False)
+            self._write_text(text if text.endswith("\n") else text + "\n")
+        self.n_rows += len(df_rows)
+
+    def _write_text(self, text):
+        self.file.write(text if self._text else text.encode("utf-8"))
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+# Load Projects - loads several projects in parallel, e.g. for a portfolio view of the host.
+# projects is a list of project names and/or IDs, or "all" for every project in projects_list(). Names and IDs are resolved with a single
+# projects request; the commits and elements of each project are then loaded on a pool of max_workers threads (sharing the client's connections).
+# Returns ({project ID: Project}, summary), where summary is a DataFrame with one row per project: its latest commit and when it was made,
+# its number of elements (in total and by type), how long it took to load, and the error if it could not be loaded.
+def load_projects(projects="all", max_workers=8, client=None, page_size=None, use_cache=True):
+    client = client or get_client()
+    df_projects = projects_list(client)
+    project_names = dict(zip(df_projects["Project ID"], df_projects["Project Name"])) if len(df_projects) > 0 else {}
+    ids_by_name = {}
+    for project_id, project_name in project_names.items():
+        ids_by_name.setdefault(project_name, project_id) # the first project of that name, as Project(name) does
+
+    if isinstance(projects, str) and projects == "all":
+        project_ids = list(project_names)
+    else:
+        project_ids = []
+        for project in projects:
+            if project in project_names:
+                project_ids.append(project)
+            elif project in ids_by_name:
+                project_ids.append(ids_by_name[project])
+            else:
+                raise ValueError(f"Project {project} does not exist or name has typo.")
+    project_ids = list(OrderedDict.fromkeys(project_ids)) # each project once, in the given order
+
+    def load(project_id):
+        start = time.perf_counter()
+        try:
+            project = Project(id=project_id, client=client, page_size=page_size, use_cache=use_cache, projects=df_projects)
+            error = None
+        except Exception as e: # one project that cannot be loaded (e.g. no commits yet) does not stop the others
+            project, error = None, str(e)
+        return project_id, project, time.perf_counter() - start, error
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(project_ids) or 1))) as pool:
+        results = list(pool.map(load, project_ids))
+
+    loaded_projects = {}
+    summary_data = []
+    for project_id, project, seconds, error in results:
+        row = {"Project Name": project_names[project_id], "Project ID": project_id}
+        if project is not None:
+            loaded_projects[project_id] = project
+            row.update({"Latest Commit": project.latest_commit,
+                        "Commit Created": project.all_commits.iloc[0]["Commit Created"],
+                        "Elements": len(project.element_index)})
+            row.update(Counter(record["type"] for record in project.element_index.values()))
+        row.update({"Load Seconds": round(seconds, 3), "Error": error})
+        summary_data.append(row)
+
+    summary_columns = ["Project Name", "Project ID", "Latest Commit", "Commit Created", "Elements", "Load Seconds", "Error"]
+    type_columns = list(OrderedDict.fromkeys(key for row in summary_data for key in row if key not in summary_columns)) # element counts by type
+    summary = pd.DataFrame.from_records(summary_data, columns=summary_columns + type_columns)
+    summary[type_columns] = summary[type_columns].fillna(0).astype(int)
+
+    return loaded_projects, summary
+
+
+########## ASYNC API ##########
+
+# AsyncAPIClient - asyncio counterpart of APIClient (built on httpx). Independent requests can run concurrently, at most max_concurrency at a time,
+# over a pool of up to pool_maxsize keep-alive connections. Like any asyncio object, use it from the event loop it was first used in.
+class AsyncAPIClient:
+
+    def __init__(self, host_name=None, max_concurrency=8, pool_maxsize=16, timeout=60, compression=True):
+        import httpx # only needed by the async API
+
+        self.host = (host_name or host).rstrip("/")
+        self.request_counts = Counter()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.session = httpx.AsyncClient(limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+                                         timeout=timeout,
+                                         headers={"Accept": "application/json",
+                                                  "Accept-Encoding": "gzip, deflate" if compression else "identity"})
+
+    def url(self, path):
+        return _url(self.host, path)
+
+    async def get(self, path, **kwargs):
+        async with self._semaphore:
+            self.request_counts[("GET", _endpoint(path))] += 1
+            return await self.session.get(self.url(path), **kwargs)
+
+    async def post(self, path, body=None, **kwargs):
+        async with self._semaphore:
+            self.request_counts[("POST", _endpoint(path))] += 1
+            return await self.session.post(self.url(path), headers={"Content-Type": "application/json"}, content=json.dumps(body), **kwargs)
+
+    async def aclose(self):
+        await self.session.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+# Async Get Projects - returns a dataFrame of all projects within the host (see projects_list())
+async def async_projects_list(client):
+    projects_response = await client.get("projects")
+
+    if projects_response.status_code == 200:
+        projects = projects_response.json()
+        projects_data = list(map(lambda b: {'Project Name':b['name'], 'Project ID':b['@id']}, projects))
+        df_projects = pd.DataFrame.from_records(projects_data, columns=['Project Name', 'Project ID'])
+        return df_projects.sort_values(by='Project Name')
+    else:
+        raise ValueError("Problem in fetching projects")
+
+# Async Get Commits - returns the commits (list of commit dicts) of a project
+async def async_commits_list(project_id, client):
+    commits_response = await client.get(f"projects/{project_id}/commits")
+
+    if commits_response.status_code == 200:
+        return commits_response.json()
+    else:
+        raise ValueError(f"Status Code: {commits_response.status_code}. Problem in fetching commits of project {project_id}.")
+
+# Async Iterate Elements - asyncio counterpart of iter_elements(): yields the elements of a commit one page at a time, using the element cache the same way
+async def async_iter_elements(project_id, commit_id, client, page_size=ELEMENTS_PAGE_SIZE, use_cache=True):
+    cache = element_cache if use_cache else None
+
+    if cache is not None:
+        cached_batches = cache.read(client.host, project_id, commit_id)
+        if cached_batches is not None:
+            for batch in cached_batches:
+                yield batch
+            return
+
+    entry = cache.open_entry(client.host, project_id, commit_id) if cache is not None else None
+    try:
+        path = f"projects/{project_id}/commits/{commit_id}/elements"
+        params = {"page[size]": page_size}
+
+        while path:
+            response = await client.get(path, params=params)
+            if response.status_code != 200:
+                raise ValueError(f"Status Code: {response.status_code}. Problem in fetching elements of project {project_id}, commit {commit_id}.")
+
+            batch = response.json()
+            if batch:
+                if entry is not None:
+                    entry.add(batch)
+                yield batch
+
+            # the "next" link already carries the page[size] and page[after] parameters
+            path = response.links.get("next", {}).get("url")
+            params = None
+
+        if entry is not None:
+            entry.save()
+    finally:
+        if entry is not None:
+            entry.abort() # no-op once saved
+
+
+# AsyncProject - a Project loaded with the async API:
+#   project = await AsyncProject.load("My Project")
+# The projects table and the commits are requested concurrently when the project id is given. Once loaded, it is a regular Project:
+# its edit methods use the (synchronous) APIClient given as client, or the shared client of the host.
+class AsyncProject(Project):
+
+    @classmethod
+    async def load(cls, name=None, id=None, index=None, async_client=None, client=None, page_size=None, verify_changes=False, use_cache=True):
+        if async_client is None:
+            async with AsyncAPIClient() as async_client:
+                return await cls.load(name, id, index, async_client, client, page_size, verify_changes, use_cache)
+
+        project = cls.__new__(cls)
+        project._setup(name, id, index, client or get_client(async_client.host), page_size, verify_changes, use_cache)
+
+        if project.id is not None:
+            df_projects, commits = await asyncio.gather(async_projects_list(async_client), async_commits_list(project.id, async_client))
+            project._resolve_project(df_projects)
+        else:
+            project._resolve_project(await async_projects_list(async_client))
+            commits = await async_commits_list(project.id, async_client)
+        project._set_commits(commits)
+
+        element_index = ElementIndex()
+        async for batch in async_iter_elements(project.id, project.current_commit, async_client, project.page_size, use_cache):
+            for element in batch:
+                element_index.add(_element_record(element))
+        project._set_element_index(element_index)
+        project._update_tree()
+
+        return project
+
+
+# Async Load Projects - loads several projects (given by name) concurrently, returns {name: AsyncProject}
+async def async_load_projects(names, async_client=None, **project_options):
+    if async_client is None:
+        async with AsyncAPIClient() as async_client:
+            return await async_load_projects(names, async_client, **project_options)
+
+    projects = await asyncio.gather(*(AsyncProject.load(name, async_client=async_client, **project_options) for name in names))
+    return dict(zip(names, projects))
+
+
+# A single event loop running in a background thread, so that synchronous code (e.g. the dashboard) can use the async API
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+def background_loop():
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="sysml-api-async", daemon=True).start()
+    return _background_loop
+
+# Run In Background - schedules a coroutine on the background loop and returns a concurrent.futures.Future of its result, e.g.
+#   future = run_in_background(AsyncProject.load("My Project")) ... project = future.result()
+def run_in_background(coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, background_loop())
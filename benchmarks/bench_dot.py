@@ -0,0 +1,62 @@
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import API_scripts as api
+from synthetic import synthetic_elements, pages
+
+### DOT generation benchmark ###
+"""
+Times writing the DOT source of the tree of synthetic models with Project.generate_dot() against the previous implementation
+(string concatenation and a tree.parent() lookup per node), without any server or Graphviz.
+
+Usage: python benchmarks/bench_dot.py [sizes...]
+"""
+
+
+# The previous Project.generate_dot(), kept here as the baseline
+def legacy_generate_dot(tree):
+    dot_string = "digraph G {\n"
+    for node in tree.all_nodes():
+        dot_string += f'    "{node.identifier}" [label="{node.tag}"];\n'
+        if not node.is_root():
+            parent = tree.parent(node.identifier).identifier
+            dot_string += f'    "{parent}" -> "{node.identifier}";\n'
+    dot_string += "}"
+    return dot_string
+
+
+def timed(function, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+
+def bench(n_parts):
+    # A Project without any request: only the pieces that load the elements and build the tree are run
+    project = api.Project.__new__(api.Project)
+    project._load_elements(pages(synthetic_elements(n_parts)))
+    project._build_tree()
+
+    legacy_dot, legacy_time = timed(legacy_generate_dot, project.tree)
+    dot, dot_time = timed(project.generate_dot)
+    _, stream_time = timed(project.write_dot, io.StringIO())
+
+    # same nodes and edges; only the labels differ (their line breaks are escaped)
+    assert legacy_dot.count(" -> ") == dot.count(" -> ") and legacy_dot.count("[label=") == dot.count("[label=")
+
+    return project.tree.size(), legacy_time, dot_time, stream_time
+
+
+def main(sizes):
+    print(f"{'parts':>8} {'nodes':>8} {'legacy (s)':>11} {'generate_dot (s)':>17} {'write_dot (s)':>14} {'speed-up':>9}")
+    for n_parts in sizes:
+        n_nodes, legacy_time, dot_time, stream_time = bench(n_parts)
+        print(f"{n_parts:>8} {n_nodes:>8} {legacy_time:>11.3f} {dot_time:>17.3f} {stream_time:>14.3f} {legacy_time / dot_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,128 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import API_scripts as api
+from mock_server import MockServer
+from synthetic import synthetic_elements
+
+### Project benchmark ###
+"""
+Loads, edits, refreshes, and renders a Project on synthetic models served by the in-process mock server (mock_server.py),
+and reports for every step its time, the requests it sent, and the peak memory it allocated (tracemalloc):
+
+    load                    Project(name): the commits and every page of elements, then the element index and the tree
+    create / attribute /    one create_element(), add_attribute(), update_element(), and delete_element() (of a part with its subtree),
+    update / delete         each posted as a commit and applied to the loaded model
+    refresh (no change)     refresh() when the server has no new commit
+    refresh (new commit)    refresh() after a commit made by someone else on the server
+    tree                    _update_tree(): the tree rebuilt from the element index
+    dot                     generate_dot(): the DOT source of the whole tree
+    render                  render_tree(): the image laid out by Graphviz (only if pygraphviz is installed, and only up to --render-max elements)
+
+Every size is run twice on a fresh server: once timed, and once under tracemalloc for the peak memory (tracing slows Python down, so
+the times of that run are not used). The server runs in the same process, so the peaks also hold the pages it encodes.
+
+Usage: python benchmarks/bench_project.py [sizes...] [--depth D] [--fanout F] [--attributes A] [--requirements R] [--page-size P]
+Sizes are numbers of parts; with the default densities a model has about twice as many elements.
+"""
+
+
+# Runs the function with its printing silenced; returns its time (s), the requests it sent through the client, and its peak memory (bytes, if traced)
+def measure(client, function, trace=False):
+    request_counts = client.request_counts.copy()
+    if trace:
+        tracemalloc.start()
+
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+    seconds = time.perf_counter() - start_time
+
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, sum((client.request_counts - request_counts).values()), peak
+
+
+# Runs every step on a fresh server holding a synthetic model; returns [(step, seconds, requests, peak)]
+def run(n_parts, options, trace=False):
+    elements = synthetic_elements(n_parts, depth=options.depth, fanout=options.fanout,
+                                  attribute_density=options.attributes, requirement_density=options.requirements)
+
+    with MockServer() as server:
+        server.add_project("Synthetic", elements)
+        client = api.APIClient(server.url)
+        results = []
+        project = None
+
+        def step(name, function):
+            results.append((name, *measure(client, function, trace)))
+
+        def load():
+            nonlocal project
+            project = api.Project("Synthetic", client=client, page_size=options.page_size, use_cache=False)
+
+        step("load", load)
+        step("create", lambda: project.create_element("Benchmark Part", "Part 1"))
+        step("attribute", lambda: project.add_attribute("mass", 12.5, "Benchmark Part"))
+        step("update", lambda: project.update_element("Benchmark Part", "Benchmark Part Renamed"))
+        step("delete", lambda: project.delete_element("Part 2"))
+
+        step("refresh (no change)", project.refresh)
+        server.commit(project.id, [{"@type": "DataVersion", "payload": {"@type": "PartUsage", "name": "Remote Part",
+                                                                        "ownedElement": [{"@id": project.tree.root}]}}])
+        step("refresh (new commit)", project.refresh)
+
+        step("tree", project._update_tree)
+        step("dot", project.generate_dot)
+        if _has_pygraphviz() and len(project.element_index) <= options.render_max:
+            step("render", lambda: project.render_tree(format="svg"))
+
+        client.close()
+        return len(elements), results
+
+
+def _has_pygraphviz():
+    try:
+        import pygraphviz
+    except ImportError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks a Project on synthetic models served by an in-process mock server.")
+    parser.add_argument("sizes", nargs="*", type=int, default=[1000, 10000, 50000], help="numbers of parts")
+    parser.add_argument("--depth", type=int, default=10, help="depth of the part tree")
+    parser.add_argument("--fanout", type=int, default=8, help="most children of a part")
+    parser.add_argument("--attributes", type=float, default=1.0, help="attributes per part, on average")
+    parser.add_argument("--requirements", type=float, default=0.1, help="requirements per part, on average")
+    parser.add_argument("--page-size", type=int, default=api.ELEMENTS_PAGE_SIZE, help="elements per page")
+    parser.add_argument("--render-max", type=int, default=5000, help="largest model (elements) laid out by Graphviz")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    options = parser.parse_args()
+
+    # the benchmark measures downloads: nothing is read from the element cache
+    api.disable_element_cache()
+
+    for n_parts in options.sizes:
+        n_elements, timed_results = run(n_parts, options)
+        _, traced_results = (None, [(None, None, None, None)] * len(timed_results)) if options.no_memory else run(n_parts, options, trace=True)
+
+        print(f"{n_parts} parts, {n_elements} elements")
+        print(f"    {'step':<22} {'time (ms)':>10} {'requests':>9} {'peak (MB)':>10}")
+        for (name, seconds, requests, _), (_, _, _, peak) in zip(timed_results, traced_results):
+            peak_text = "-" if peak is None else f"{peak / 2**20:.1f}"
+            print(f"    {name:<22} {seconds * 1000:>10.1f} {requests:>9} {peak_text:>10}")
+
+
+if __name__ == "__main__":
+    main()
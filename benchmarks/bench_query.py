@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import API_scripts as api
+from synthetic import synthetic_elements, pages
+
+### Query benchmark ###
+"""
+Times Project.query() on synthetic models (about 100k elements by default), without any server.
+The first query of a commit also builds the element tables it runs on; the others only run column operations over them.
+
+Usage: python benchmarks/bench_query.py [sizes...]
+"""
+
+
+QUERIES = {
+    "type":                lambda project: project.query(type="PartUsage"),
+    "name pattern":        lambda project: project.query(name="Part 1*"),
+    "owner":               lambda project: project.query(owner="Root Part"),
+    "ancestor, depth 2":   lambda project: project.query(ancestor="Part 1", max_depth=2),
+    "depth 3":             lambda project: project.query(max_depth=3),
+    "mass > 50":           lambda project: project.query(where="mass > 50"),
+    "combined":            lambda project: project.query(type="PartUsage", name="Part *", ancestor="Part 2", where=["mass > 50", "cost < 20"]),
+}
+
+
+def timed(function, *args):
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+
+def bench(n_parts):
+    # A Project without any request: only the pieces that load the elements are run
+    project = api.Project.__new__(api.Project)
+    project._load_elements(pages(synthetic_elements(n_parts)))
+
+    _, first_time = timed(QUERIES["type"], project)
+    print(f"{n_parts} parts, {len(project.element_index)} elements; first query (builds the tables): {first_time * 1000:.1f} ms")
+
+    for label, query in QUERIES.items():
+        times = []
+        for _ in range(5):
+            result, query_time = timed(query, project)
+            times.append(query_time)
+        print(f"    {label:<20} {len(result):>8} results {min(times) * 1000:>8.1f} ms")
+
+
+def main(sizes):
+    for n_parts in sizes:
+        bench(n_parts)
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [50000])
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import API_scripts as api
+from synthetic import synthetic_elements, pages
+
+### Tree construction benchmark ###
+"""
+Times loading the elements and building the containment tree of synthetic models from 1k to 100k parts, without any server.
+If the builders are linear, the time per element stays roughly constant as the model grows.
+
+Usage: python benchmarks/bench_tree.py [sizes...]
+"""
+
+
+def bench(n_parts):
+    elements = synthetic_elements(n_parts)
+
+    # A Project without any request: only the pieces that load the elements and build the tree are run
+    project = api.Project.__new__(api.Project)
+
+    start_time = time.perf_counter()
+    project._load_elements(pages(elements))
+    load_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    project._build_tree()
+    tree_time = time.perf_counter() - start_time
+
+    return len(elements), load_time, tree_time
+
+
+def main(sizes):
+    print(f"{'parts':>8} {'elements':>9} {'load (s)':>9} {'tree (s)':>9} {'us/element':>11}")
+    for n_parts in sizes:
+        n_elements, load_time, tree_time = bench(n_parts)
+        print(f"{n_parts:>8} {n_elements:>9} {load_time:>9.3f} {tree_time:>9.3f} {(load_time + tree_time) / n_elements * 1e6:>11.2f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,243 @@
+import itertools
+import json
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+### Mock SysML v2 API server ###
+"""
+An in-process mock of the SysML v2 REST endpoints used by the API scripts, so that loading, editing, and refreshing projects
+can be measured on models of any size without a real server:
+
+    GET  /projects
+    POST /projects
+    GET  /projects/{project id}/commits
+    POST /projects/{project id}/commits                            (a change with payload None deletes the element)
+    GET  /projects/{project id}/commits/{commit id}/elements       (paginated with page[size] / page[after] and a "next" Link header)
+    GET  /projects/{project id}/commits/{commit id}/elements/{element id}
+    GET  /projects/{project id}/commits/{commit id}/changes
+    POST /projects/{project id}/query-results?commitId={commit id} (where-clause on @type, select list)
+
+Every commit keeps its own copy of the elements dict, copied from its previous commit: simple, and fast enough for benchmarks.
+With assign_ids, new elements get an @id chosen by the server, even when the client sent one (references to them in the same
+commit are rewritten), as a server is free to do.
+
+    with MockServer() as server:
+        project_id = server.add_project("Synthetic", synthetic_elements(10000))
+        api.change_host(server.url)
+"""
+
+
+# MockServer - the server and the projects, commits, and elements it holds. Requests are counted by (method, endpoint) in request_counts.
+class MockServer:
+
+    def __init__(self, host="127.0.0.1", port=0, assign_ids=False):
+        self.assign_ids = assign_ids
+        self.projects = {} # project id -> project
+        self.commits = {} # commit id -> commit
+        self.elements = {} # commit id -> {element id: element}
+        self.changes = {} # commit id -> changes (DataVersions) from its previous commit
+        self.request_counts = Counter()
+        self.lock = threading.Lock()
+        self._positions = {} # commit id -> {element id: position}, for page[after]
+        self._last_created = datetime.now(timezone.utc)
+
+        handler = type("MockHandler", (_MockHandler,), {"mock": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Creates a project whose first commit holds the given elements (element dicts); returns the project id
+    def add_project(self, name, elements=(), description=""):
+        with self.lock:
+            project = self._new_project(name, description)
+            self._commit(project["@id"], [{"@type": "DataVersion", "identity": {"@id": element["@id"]}, "payload": element} for element in elements], None)
+        return project["@id"]
+
+    # Posts a commit to the project, on top of its latest commit unless previous_commit is given (e.g. someone else editing the model); returns the commit
+    def commit(self, project_id, changes, previous_commit=None):
+        with self.lock:
+            return self._commit(project_id, changes, previous_commit or self.head(project_id))
+
+    # The id of the latest commit of the project
+    def head(self, project_id):
+        project_commits = [commit for commit in self.commits.values() if commit["owningProject"]["@id"] == project_id]
+        return max(project_commits, key=lambda commit: commit["created"])["@id"] if project_commits else None
+
+    def _new_project(self, name, description):
+        project_id = str(uuid.uuid4())
+        self.projects[project_id] = {"@id": project_id, "@type": "Project", "name": name, "description": description}
+        return self.projects[project_id]
+
+    def _commit(self, project_id, changes, previous_commit):
+        elements = dict(self.elements[previous_commit]) if previous_commit else {}
+
+        def given_id(change):
+            return (change.get("identity") or {}).get("@id") or (change.get("payload") or {}).get("@id")
+
+        new_ids = {} # @id sent by the client -> @id assigned here
+        if self.assign_ids:
+            new_ids = {given_id(change): str(uuid.uuid4()) for change in changes
+                       if change.get("payload") is not None and given_id(change) is not None and given_id(change) not in elements}
+
+        applied_changes = []
+        for change in changes:
+            element_id = new_ids.get(given_id(change), given_id(change)) or str(uuid.uuid4())
+            if change.get("payload") is None:
+                elements.pop(element_id, None)
+                applied_changes.append({"@type": "DataVersion", "identity": {"@id": element_id}, "payload": None})
+            else:
+                element = dict(change["payload"], **{"@id": element_id})
+                if new_ids and element.get("ownedElement"):
+                    element["ownedElement"] = [{"@id": new_ids.get(owned["@id"], owned["@id"])} for owned in element["ownedElement"]]
+                element.setdefault("ownedElement", [])
+                element.setdefault("text", [])
+                elements[element_id] = element
+                applied_changes.append({"@type": "DataVersion", "identity": {"@id": element_id}, "payload": element})
+
+        # strictly increasing creation times, so commits posted within the same microsecond keep their order
+        self._last_created = max(datetime.now(timezone.utc), self._last_created + timedelta(microseconds=1))
+        commit_id = str(uuid.uuid4())
+        self.commits[commit_id] = {"@id": commit_id,
+                                   "@type": "Commit",
+                                   "created": self._last_created.isoformat(),
+                                   "owningProject": {"@id": project_id},
+                                   "previousCommit": {"@id": previous_commit} if previous_commit else None}
+        self.elements[commit_id] = elements
+        self.changes[commit_id] = applied_changes
+        return self.commits[commit_id]
+
+    # One page of the elements of a commit, and the element id to continue after (None on the last page)
+    def _page(self, commit_id, size, after):
+        elements = self.elements[commit_id]
+        start = 0
+        if after is not None:
+            positions = self._positions.get(commit_id)
+            if positions is None:
+                positions = self._positions[commit_id] = {element_id: position for position, element_id in enumerate(elements)}
+            start = positions[after] + 1
+        page = list(itertools.islice(elements.values(), start, start + size))
+        return page, page[-1]["@id"] if page and start + size < len(elements) else None
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock = None # the MockServer, set on the subclass
+
+    # each response leaves in one write (flushed after every request), without waiting on Nagle's algorithm: otherwise every request
+    # of a keep-alive connection would stall on the client's delayed ACK and the benchmarks would mostly measure that
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        segments = [segment for segment in url.path.split("/") if segment]
+        query = parse_qs(url.query)
+        mock = self.mock
+
+        if segments == ["projects"]:
+            mock.request_counts[("GET", "projects")] += 1
+            return self.send_json(200, list(mock.projects.values()))
+
+        if len(segments) < 3 or segments[0] != "projects" or segments[1] not in mock.projects:
+            return self.send_json(404, {"error": "Not found"})
+        project_id = segments[1]
+
+        if len(segments) == 3 and segments[2] == "commits":
+            mock.request_counts[("GET", "commits")] += 1
+            return self.send_json(200, [commit for commit in mock.commits.values() if commit["owningProject"]["@id"] == project_id])
+
+        if len(segments) < 5 or segments[3] not in mock.elements:
+            return self.send_json(404, {"error": "Not found"})
+        commit_id = segments[3]
+
+        if len(segments) == 5 and segments[4] == "elements":
+            mock.request_counts[("GET", "elements")] += 1
+            if "page[size]" not in query:
+                return self.send_json(200, list(mock.elements[commit_id].values()))
+
+            size = int(query["page[size]"][0])
+            page, last_id = mock._page(commit_id, size, query.get("page[after]", [None])[0])
+            headers = {}
+            if last_id is not None:
+                headers["Link"] = f'<{mock.url}projects/{project_id}/commits/{commit_id}/elements?page[size]={size}&page[after]={last_id}>; rel="next"'
+            return self.send_json(200, page, headers)
+
+        if len(segments) == 6 and segments[4] == "elements":
+            mock.request_counts[("GET", "elements/{id}")] += 1
+            element = mock.elements[commit_id].get(segments[5])
+            return self.send_json(200, element) if element is not None else self.send_json(404, {"error": "Not found"})
+
+        if len(segments) == 5 and segments[4] == "changes":
+            mock.request_counts[("GET", "changes")] += 1
+            return self.send_json(200, mock.changes[commit_id])
+
+        self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        segments = [segment for segment in url.path.split("/") if segment]
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        mock = self.mock
+
+        if segments == ["projects"]:
+            mock.request_counts[("POST", "projects")] += 1
+            with mock.lock:
+                return self.send_json(200, mock._new_project(body.get("name"), body.get("description", "")))
+
+        if len(segments) != 3 or segments[0] != "projects" or segments[1] not in mock.projects:
+            return self.send_json(404, {"error": "Not found"})
+        project_id = segments[1]
+
+        if segments[2] == "commits":
+            mock.request_counts[("POST", "commits")] += 1
+            previous_commit = (body.get("previousCommit") or {}).get("@id")
+            if previous_commit is not None and previous_commit not in mock.elements:
+                return self.send_json(400, {"error": f"Unknown previous commit {previous_commit}"})
+            with mock.lock:
+                return self.send_json(200, mock._commit(project_id, body.get("change", []), previous_commit))
+
+        if segments[2] == "query-results":
+            mock.request_counts[("POST", "query-results")] += 1
+            commit_id = parse_qs(url.query).get("commitId", [None])[0]
+            if commit_id not in mock.elements:
+                return self.send_json(404, {"error": "Not found"})
+            where = body.get("where")
+            constraints = [] if not where else where.get("constraint", [where])
+            types = {constraint["value"] for constraint in constraints}
+            fields = body.get("select")
+            return self.send_json(200, [{field: element[field] for field in fields if field in element} if fields else element
+                                        for element in mock.elements[commit_id].values() if not types or element["@type"] in types])
+
+        self.send_json(404, {"error": "Not found"})
@@ -0,0 +1,68 @@
+import random
+import uuid
+
+### Synthetic SysML v2 models ###
+"""
+Generates synthetic models shaped like the elements returned by the SysML v2 API (/projects/{id}/commits/{id}/elements),
+so the API scripts can be measured on models of any size without a real server.
+
+A model is a single "Root Part" with a tree of parts below it (depth levels, each part having up to fanout children),
+plus attributes ("name: value") and requirements owned by the parts.
+"""
+
+
+# Returns a list of element dicts: n_parts parts in a tree of the given depth and fan-out, with attribute_density attributes
+# and requirement_density requirements per part (on average)
+def synthetic_elements(n_parts=1000, depth=10, fanout=8, attribute_density=1.0, requirement_density=0.1, seed=0):
+    rng = random.Random(seed)
+
+    def new_id():
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def element(type, name, owner_id=None, text=None):
+        return {"@id": new_id(),
+                "@type": type,
+                "name": name,
+                "ownedElement": [{"@id": owner_id}] if owner_id else [],
+                "text": text or []}
+
+    root = element("PartUsage", "Root Part")
+    elements = [element("Comment", "Project Name: Synthetic"), root]
+    parts = [(root["@id"], 0)]
+
+    # breadth-first, so the tree fills level by level up to the requested depth
+    next_parent = 0
+    while len(parts) < n_parts and next_parent < len(parts):
+        parent_id, level = parts[next_parent]
+        next_parent += 1
+        if level >= depth:
+            continue
+        for _ in range(rng.randint(1, fanout)):
+            if len(parts) >= n_parts:
+                break
+            part = element("PartUsage", f"Part {len(parts)}", parent_id)
+            elements.append(part)
+            parts.append((part["@id"], level + 1))
+
+    for part_id, _ in parts:
+        for _ in range(_poisson(rng, attribute_density)):
+            name = rng.choice(["mass", "cost", "power", "length"])
+            elements.append(element("AttributeUsage", f"{name}: {rng.uniform(0, 100):.2f}", part_id))
+        for _ in range(_poisson(rng, requirement_density)):
+            elements.append(element("RequirementUsage", f"Requirement {len(elements)}", part_id, [f"The part shall meet requirement {len(elements)}."]))
+
+    return elements
+
+
+# Splits a list of elements into pages, like the paginated elements endpoint
+def pages(elements, page_size=1000):
+    return [elements[start:start + page_size] for start in range(0, len(elements), page_size)]
+
+
+def _poisson(rng, mean):
+    # small-mean Poisson sample (Knuth); good enough for element densities
+    limit, count, product = pow(2.718281828459045, -mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
@@ -1,6 +1,177 @@
+import io
+import time
+import threading
+from collections import Counter
 import streamlit as st
 import API_scripts as api
 
+
+# How often (in seconds) a loaded project checks its server for commits made elsewhere
+HEAD_CHECK_SECONDS = 10
+
+# Loaded projects, kept across reruns and shared by all sessions: {(host, project ID): [project, time of its last check for new commits, lock]}
+# A shared project is never edited. Sessions only copy it (see get_project()) and then edit and refresh their own copy, so no session ever
+# changes a model that another one is reading. The shared project is only loaded and moved to newer commits, under its own lock.
+@st.cache_resource
+def loaded_projects():
+    return {}, threading.Lock()
+
+# The projects table, requested again only when a project is created or after a minute
+@st.cache_data(ttl=60)
+def projects_table(host):
+    return api.projects_list()
+
+# Models with more elements than this open in the tree explorer rather than as a single image
+EXPLORER_THRESHOLD = 500
+
+# Children listed at a time under an expanded element of the tree explorer ("Show more" lists the next ones)
+EXPLORER_PAGE_SIZE = 50
+
+# Shows the tree of the project's current commit in the given placeholder, as an image or in the tree explorer (see the "Tree View" option).
+# The image is only held in memory (see Project.render_tree()), so sessions looking at different projects or commits never overwrite each other's image.
+def show_tree(tree_image, project, redraw=True):
+    if st.session_state.get("tree_view") == "Explorer":
+        if redraw:
+            st.rerun() # the explorer's buttons must keep their keys, so after an edit the whole page is drawn again
+        show_explorer(tree_image, project)
+    elif st.session_state.get("svg_tree"):
+        tree_image.image(project.render_tree(format="svg", rollup=selected_rollup(), diff_with=st.session_state.get("compare_commit")).decode("utf-8"))
+    else:
+        tree_image.image(project.render_tree(format="png", rollup=selected_rollup(), diff_with=st.session_state.get("compare_commit")))
+
+# The roll-up shown in the tree, as (attribute, aggregate), or None (see the "Roll Up" option)
+def selected_rollup():
+    if st.session_state.get("rollup_attribute"):
+        return (st.session_state.rollup_attribute, st.session_state.get("rollup_agg", "sum"))
+    return None
+
+# Tree explorer: starts from the root elements and only lists the children of the elements the user expanded, read from the project's
+# element index (no request, no layout), so what it costs depends on the rows shown, not on the size of the model.
+def show_explorer(tree_explorer, project):
+    element_index = project.element_index
+    expanded = st.session_state.setdefault("expanded_elements", {}) # element ID -> number of its children listed
+    rollup = selected_rollup()
+    rollup_values = project.rollup(*rollup) if rollup else {}
+    diff = project.diff(st.session_state.compare_commit) if st.session_state.get("compare_commit") else None
+
+    def toggle(element_id):
+        if expanded.pop(element_id, None) is None:
+            expanded[element_id] = EXPLORER_PAGE_SIZE
+
+    def show_more(element_id):
+        expanded[element_id] += EXPLORER_PAGE_SIZE
+
+    def shown_children(element_id):
+        return [child_id for child_id in element_index.children_ids(element_id) if element_index[child_id]["type"] != "Comment"]
+
+    with tree_explorer.container(border=True):
+        stack = [(root_id, 0, False) for root_id in reversed(shown_children(None))] # (element ID, depth, whether it is its "Show more" row)
+        while stack:
+            element_id, depth, more = stack.pop()
+            indent = "\u2003" * depth
+
+            if more:
+                st.button(indent + "… Show more", key=f"explore-more-{element_id}", on_click=show_more, args=(element_id,))
+                continue
+
+            record = element_index[element_id]
+            children = shown_children(element_id)
+            marker = ("▾" if element_id in expanded else "▸") if children else "•"
+            kind = {"AttributeUsage": "Attribute: ", "RequirementUsage": "Requirement: "}.get(record["type"], "")
+            label = indent + f"{marker} {kind}{record['name']}" + (f" ({len(children)})" if children else "")
+            if element_id in rollup_values:
+                label += f" — {rollup[0]} ({rollup[1]}): {rollup_values[element_id]:g}"
+            if diff is not None and diff.kinds(element_id):
+                label += f" :orange[({', '.join(diff.kinds(element_id))})]"
+            st.button(label, key=f"explore-{element_id}", on_click=toggle, args=(element_id,), disabled=not children)
+
+            if element_id in expanded:
+                listed = expanded[element_id]
+                if len(children) > listed:
+                    stack.append((element_id, depth + 1, True))
+                stack.extend((child_id, depth + 1, False) for child_id in reversed(children[:listed]))
+
+# Export formats offered: label -> (format of Project.export(), file extension, MIME type)
+EXPORT_FORMATS = {"CSV": ("csv", "csv", "text/csv"),
+                  "JSON Lines": ("jsonl", "jsonl", "application/jsonl"),
+                  "Parquet": ("parquet", "parquet", "application/vnd.apache.parquet")}
+
+# Button exporting the elements, attributes, or requirements (kind) of the current commit, or only of the given element (id) and its descendants,
+# in the format chosen in the sidebar; the file is offered for download once it is written
+def export_button(project, label, kind, root=None, disabled=False):
+    if st.button(label, use_container_width=True, disabled=disabled):
+        format, extension, mime = EXPORT_FORMATS[st.session_state.get("export_format", "CSV")]
+        data = io.BytesIO()
+        try:
+            n_rows = project.export(data, kind, format, root=root)
+        except ValueError as error:
+            st.error(str(error))
+            return
+        file_name = f"{project.name} {element_name(project, root) or 'all'} {kind}.{extension}"
+        st.download_button(f"Download ({n_rows} rows)", data.getvalue(), file_name=file_name, mime=mime, use_container_width=True)
+
+# Selectbox of the elements of a query result, listed by name; returns the id of the selected element (None if there is none), so that elements
+# sharing a name stay apart. Names held by several of the listed elements are followed by the start of the element's id.
+def select_element(label, project, result):
+    element_index = project.element_index
+    element_ids = sorted(result.ids, key=lambda element_id: element_index[element_id]["name"])
+    name_counts = Counter(element_index[element_id]["name"] for element_id in element_ids)
+
+    def label_of(element_id):
+        name = element_index[element_id]["name"]
+        return f"{name} ({element_id[:8]})" if name_counts[name] > 1 else name
+
+    return st.selectbox(label, element_ids, format_func=label_of)
+
+# The name of an element given by id (None if there is no such element)
+def element_name(project, element_id):
+    record = project.element_index.get(element_id) if element_id is not None else None
+    return None if record is None else record["name"]
+
+# Returns a view of the project at an earlier commit; the last one built is kept for the session, so reruns do not rebuild it
+def history_view(project, commit_id):
+    key = (api.host, project.id, commit_id)
+    view = st.session_state.get("history_view")
+    if view is None or view[0] != key:
+        view = st.session_state["history_view"] = (key, project.at_commit(commit_id))
+    return view[1]
+
+# Returns the shared project and its lock, loading it on first use and reloading it only if its server has new commits.
+# The registry lock is only held to find the project's entry: the load itself runs under the project's lock, so a slow load
+# only holds up the sessions opening that same project.
+def shared_project(project_id):
+    projects, registry_lock = loaded_projects()
+    key = (api.host, project_id)
+
+    with registry_lock:
+        entry = projects.setdefault(key, [None, 0.0, threading.Lock()])
+
+    with entry[2]:
+        if entry[0] is None:
+            entry[0] = api.Project(id=project_id, projects=projects_table(api.host))
+            entry[1] = time.monotonic()
+        elif time.monotonic() - entry[1] > HEAD_CHECK_SECONDS:
+            entry[0].refresh()
+            entry[1] = time.monotonic()
+
+    return entry[0], entry[2]
+
+# Returns the session's own copy of the project, made from the shared project the first time the session opens it
+# (no request: see Project.at_commit()). The copy follows the session's edits and checks its server for new commits by itself.
+def get_project(project_id):
+    key = (api.host, project_id)
+    entry = st.session_state.get("project")
+
+    if entry is None or entry[0] != key:
+        project, lock = shared_project(project_id)
+        with lock:
+            entry = st.session_state["project"] = [key, project.at_commit(project.latest_commit), time.monotonic()]
+    elif time.monotonic() - entry[2] > HEAD_CHECK_SECONDS:
+        entry[1].refresh()
+        entry[2] = time.monotonic()
+
+    return entry[1]
+
 def main():
     ### Set the page configuration ###
     st.set_page_config(
@@ -10,11 +181,16 @@ def main():
 
     st.title("SysML v2 Model Dashboard")
 
+    # Commits never change, so keep their elements on disk: reopening a project or revisiting a commit is then a local read
+    if api.element_cache is None:
+        api.enable_element_cache()
+
     ### Page Layout ###
 
     st.sidebar.markdown("### Select a Project")
 
-    existing_and_new_project = api.projects_names_list()
+    df_projects = projects_table(api.host)
+    existing_and_new_project = df_projects["Project Name"] if len(df_projects) > 0 else []
 
     selected_proj_name = st.sidebar.selectbox("Select a Project",
                                 existing_and_new_project,
@@ -43,45 +219,88 @@ def main():
 
         if submit_create_element:
             api.new_project(name, desc)
+            projects_table.clear()
+            df_projects = projects_table(api.host)
             st.session_state.create_new_project_clicked = False
             selected_proj_name = f"{name}"
 
 
     if selected_proj_name: # if a project is selected...
         
-        project = api.Project(selected_proj_name)
+        project = get_project(df_projects.loc[df_projects["Project Name"] == selected_proj_name, "Project ID"].values[0])
 
         st.sidebar.divider()
 
         st.sidebar.markdown(f"### Project View")
+
+        # History: any earlier commit can be shown, read-only. The session's project stays at its latest commit, ready for edits;
+        # the earlier commit is shown through a separate view of it, rebuilt from the commits already shown (see Project.at_commit()).
+        if len(project.all_commits) > 1:
+            commit_times = dict(zip(project.all_commits["Commit ID"], project.all_commits["Commit Created"]))
+            shown_commit = st.sidebar.select_slider("Commit", list(project.all_commits["Commit ID"])[::-1], value=project.current_commit,
+                                                    format_func=lambda commit_id: f"{commit_times[commit_id]:%Y-%m-%d %H:%M:%S}")
+            if shown_commit != project.current_commit:
+                project = history_view(project, shown_commit)
         
+        st.sidebar.radio("Tree View", ["Image", "Explorer"], index=1 if len(project.element_index) > EXPLORER_THRESHOLD else 0,
+                         key="tree_view", horizontal=True)
+        st.sidebar.toggle("Vector Tree Image (SVG)", key="svg_tree")
+
+        # Changes since another commit: listed below the tree, and highlighted in it
+        other_commits = [commit_id for commit_id in project.all_commits["Commit ID"] if commit_id != project.current_commit]
+        commit_times = dict(zip(project.all_commits["Commit ID"], project.all_commits["Commit Created"]))
+        st.sidebar.selectbox("Compare With Commit", [None] + other_commits, key="compare_commit",
+                             format_func=lambda commit_id: "None" if commit_id is None else f"{commit_times[commit_id]:%Y-%m-%d %H:%M:%S} ({commit_id[:8]})")
+
+        # Roll-ups: the selected attribute (e.g. mass) aggregated over every subtree, shown in the tree
+        attribute_names = sorted(project.attributes_table["attribute"].dropna().unique())
+        st.sidebar.selectbox("Roll Up", [None] + attribute_names, key="rollup_attribute", format_func=lambda name: "None" if name is None else name)
+        if st.session_state.get("rollup_attribute"):
+            st.sidebar.radio("Aggregate", ["sum", "mean", "min", "max", "count"], key="rollup_agg", horizontal=True)
+
         if st.sidebar.toggle("View All Elements Table"):
             st.sidebar.write(project.all_elements)
 
         if st.sidebar.toggle("View All Parts Table"):
-            st.sidebar.write(project.all_elements[project.all_elements["type"]=="PartUsage"])
+            st.sidebar.write(project.query(type="PartUsage").to_frame())
 
         if st.sidebar.toggle("View All Attributes Table"):
-            st.sidebar.write(project.all_elements[project.all_elements["type"]=="AttributeUsage"])
+            st.sidebar.write(project.query(type="AttributeUsage").to_frame())
 
+        # Requirements of any commit: those of a commit that is not in memory are requested on their own, without loading its model
         if st.sidebar.toggle("View All Requirements Table"):
-            st.sidebar.write(project.all_elements[project.all_elements["type"]=="RequirementUsage"])
+            requirements_commit = st.sidebar.selectbox("Requirements At Commit", [project.current_commit] + other_commits,
+                                                       format_func=lambda commit_id: f"{commit_times[commit_id]:%Y-%m-%d %H:%M:%S} ({commit_id[:8]})")
+            st.sidebar.write(project.requirements_table(requirements_commit))
+
+        st.sidebar.radio("Export Format", list(EXPORT_FORMATS), key="export_format", horizontal=True)
         
 
         ### Main Page ###
 
         tree_image = st.empty()
-        tree_image.image("tree.png")
+        show_tree(tree_image, project, redraw=False) # drawn only now, and only once per commit
+
+        if st.session_state.get("compare_commit"):
+            diff = project.diff(st.session_state.compare_commit)
+            st.markdown(f"### Changes Since Commit {st.session_state.compare_commit[:8]}")
+            st.caption(", ".join(f"{len(getattr(diff, kind))} {kind}" for kind in diff.KINDS))
+            st.dataframe(diff.to_frame(), use_container_width=True)
 
         st.divider()
 
+        if project.current_commit != project.latest_commit:
+            st.info("This is an earlier commit, shown read-only. Move the Commit slider back to the latest commit to edit the model.")
+            st.stop()
+
         st.markdown(f"### Element Manipulation")
 
         radio_em = st.radio("Choose Element Type", ["Parts", "Attributes", "Requirements"], horizontal=True)
 
         if radio_em == "Parts":
 
-            sel_part = st.selectbox("Select Part", project.all_elements[project.all_elements["type"]=="PartUsage"])
+            sel_part_id = select_element("Select Part", project, project.query(type="PartUsage"))
+            sel_part = element_name(project, sel_part_id)
 
             c1, c2, c3, c4 = st.columns(4, gap="small")
 
@@ -105,8 +324,8 @@ def main():
 
                         if submit_create_element:
                             project.create_element(name, owner, repeat=is_repeat)
-                            tree_image.image("tree.png")
                             st.session_state.create_element_clicked = False
+                            show_tree(tree_image, project)
 
 
             with c2:
@@ -130,8 +349,8 @@ def main():
                         if submit_update_element:
                             # project.update_element(name, owner, repeat=is_repeat)
                             project.update_element(name, new_name, new_owner)
-                            tree_image.image("tree.png")
                             st.session_state.update_element_clicked = False
+                            show_tree(tree_image, project)
 
             with c3:
                 # Check if the state variable is initialized
@@ -152,15 +371,13 @@ def main():
 
                         if submit_delete_element:
                             project.delete_element(name, id)
-                            tree_image.image("tree.png")
                             st.session_state.delete_element_clicked = False
+                            show_tree(tree_image, project)
 
             with c4:
-                if st.button("Extract Element", use_container_width=True):
-                    st.success("Extracting Info Coming Soon!")
+                export_button(project, "Extract Element", "elements", root=sel_part_id, disabled=sel_part_id is None)
 
-            if st.button("Extract All Elements", use_container_width=True):
-                st.success("Extracting Info Coming Soon!")
+            export_button(project, "Extract All Elements", "elements")
 
 
 
@@ -169,11 +386,12 @@ def main():
             COL1, COL2 = st.columns(2)
 
             with COL1:
-                sel_part = st.selectbox("Select Part", project.all_elements[project.all_elements["type"]=="PartUsage"])
+                sel_part_id = select_element("Select Part", project, project.query(type="PartUsage"))
+                sel_part = element_name(project, sel_part_id)
             
             with COL2:
-                sel_att = st.selectbox("Select Attribute", project.all_elements[project.all_elements["type"]=="AttributeUsage"])
-                # TODO: Be able to see just those owned by the selected part
+                sel_att_id = select_element("Select Attribute", project, project.query(type="AttributeUsage", owner=sel_part_id)) # those owned by the selected part
+                sel_att = element_name(project, sel_att_id)
 
             c1, c2, c3, c4 = st.columns(4, gap="small")
 
@@ -196,8 +414,8 @@ def main():
 
                         if submit_create_attribute:
                             project.add_attribute(name, value, owner)
-                            tree_image.image("tree.png")
                             st.session_state.create_attribute_clicked = False
+                            show_tree(tree_image, project)
 
             with c2:
                 # Check if the state variable is initialized
@@ -217,8 +435,8 @@ def main():
 
                         if submit_update_attribute:
                             project.update_attribute(name, new_val)
-                            tree_image.image("tree.png")
                             st.session_state.update_attribute_clicked = False
+                            show_tree(tree_image, project)
 
             with c3:
                 # Check if the state variable is initialized
@@ -239,16 +457,14 @@ def main():
 
                         if submit_delete_attribute:
                             project.remove_attribute(name, id)
-                            tree_image.image("tree.png")
                             st.session_state.delete_attribute_clicked = False
+                            show_tree(tree_image, project)
 
             with c4:
-                if st.button("Extract Attribute", use_container_width=True):
-                    st.success("Extracting Info Coming Soon!")
+                export_button(project, "Extract Attribute", "attributes", root=sel_att_id, disabled=sel_att_id is None)
 
 
-            if st.button("Extract All Attributes", use_container_width=True):
-                st.success("Extracting Info Coming Soon!")
+            export_button(project, "Extract All Attributes", "attributes")
 
 
 
@@ -257,11 +473,12 @@ def main():
             COL1, COL2 = st.columns(2)
 
             with COL1:
-                sel_part = st.selectbox("Select Part", project.all_elements[project.all_elements["type"]=="PartUsage"])
+                sel_part_id = select_element("Select Part", project, project.query(type="PartUsage"))
+                sel_part = element_name(project, sel_part_id)
             
             with COL2:
-                sel_req = st.selectbox("Select Requirement", project.all_elements[project.all_elements["type"]=="RequirementUsage"])
-                # TODO: Be able to see just those owned by the selected part
+                sel_req_id = select_element("Select Requirement", project, project.query(type="RequirementUsage", owner=sel_part_id)) # those owned by the selected part
+                sel_req = element_name(project, sel_req_id)
 
             c1, c2, c3, c4 = st.columns(4, gap="small")
 
@@ -285,8 +502,8 @@ def main():
 
                         if submit_create_requirement:
                             project.create_requirement(name, desc, owner, is_repeat)
-                            tree_image.image("tree.png")
                             st.session_state.create_requirement_clicked = False
+                            show_tree(tree_image, project)
 
             with c2:
                 # Check if the state variable is initialized
@@ -307,8 +524,8 @@ def main():
 
                         if submit_update_requirement:
                             project.update_requirement(name, new_name, new_desc)
-                            tree_image.image("tree.png")
                             st.session_state.update_requirement_clicked = False
+                            show_tree(tree_image, project)
 
             with c3:
                 # Check if the state variable is initialized
@@ -329,16 +546,32 @@ def main():
 
                         if submit_delete_requirement:
                             project.delete_requirement(name, id)
-                            tree_image.image("tree.png")
                             st.session_state.delete_requirement_clicked = False
+                            show_tree(tree_image, project)
 
             with c4:
-                if st.button("Extract Requirement", use_container_width=True):
-                    st.success("Extracting Info Coming Soon!")
+                export_button(project, "Extract Requirement", "requirements", root=sel_req_id, disabled=sel_req_id is None)
+
+
+            export_button(project, "Extract All Requirements", "requirements")
+
+
+        st.divider()
+
+        st.markdown(f"### Import Elements")
+        st.caption("A CSV, Excel, or JSON table with one element per row: name, type (Part, Attribute, or Requirement), owner, value, description.")
 
+        import_file = st.file_uploader("Elements File", type=["csv", "xlsx", "json", "jsonl"])
 
-            if st.button("Extract All Requirements", use_container_width=True):
-                st.success("Extracting Info Coming Soon!")
+        if import_file is not None and st.button("Import", use_container_width=True):
+            import_progress = st.progress(0.0, text="Importing...")
+            try:
+                result = project.import_model(import_file, progress=lambda done, total: import_progress.progress(done / total, text=f"Imported {done}/{total} rows"))
+            except ValueError as error:
+                st.error(str(error))
+            else:
+                st.success(f"Imported {result['imported']} rows in {result['commits']} commits ({result['skipped']} already in the model).")
+                show_tree(tree_image, project)
 
 
 
@@ -0,0 +1,286 @@
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+import API_scripts as api
+from mock_server import MockServer
+from synthetic import synthetic_elements
+
+### Request tests ###
+"""
+Checks, against the in-process mock server (benchmarks/mock_server.py), the requests a Project sends and how it uses the answers:
+the elements of a commit are downloaded once per load (one GET per page), a refresh without new commits downloads nothing,
+new elements take the @id the server gives them, and a failed query only turns query pushdown off when the server has no query endpoint.
+
+    pip install -r requirements.txt
+    python -m pytest tests
+"""
+
+
+@pytest.fixture
+def server():
+    api.disable_element_cache()
+    with MockServer() as server:
+        yield server
+
+
+def new_project(server, n_parts=100, page_size=api.ELEMENTS_PAGE_SIZE):
+    server.add_project("Synthetic", synthetic_elements(n_parts))
+    client = api.APIClient(server.url)
+    return api.Project("Synthetic", client=client, page_size=page_size), client
+
+
+def test_load_gets_elements_once(server):
+    project, client = new_project(server)
+
+    assert client.request_counts[("GET", "elements")] == 1
+    assert client.request_counts[("GET", "commits")] == 1
+    assert client.request_counts[("GET", "projects")] == 1
+    assert sum(client.request_counts.values()) == 3
+    assert len(project.element_index) == len(server.elements[project.current_commit])
+
+
+def test_load_gets_one_page_at_a_time(server):
+    project, client = new_project(server, n_parts=1000, page_size=500)
+
+    n_elements = len(server.elements[project.current_commit])
+    assert client.request_counts[("GET", "elements")] == -(-n_elements // 500)
+    assert len(project.element_index) == n_elements
+
+
+def test_refresh_without_new_commit_gets_no_elements(server):
+    project, client = new_project(server)
+    client.request_counts.clear()
+
+    assert project.refresh() is False
+    assert dict(client.request_counts) == {("GET", "commits"): 1}
+
+
+def test_refresh_after_new_commit_gets_elements_once(server):
+    project, client = new_project(server)
+    client.request_counts.clear()
+
+    server.commit(project.id, [{"@type": "DataVersion", "payload": {"@type": "PartUsage", "name": "Remote Part",
+                                                                    "ownedElement": [{"@id": project.tree.root}]}}])
+
+    assert project.refresh() is True
+    assert dict(client.request_counts) == {("GET", "commits"): 1, ("GET", "elements"): 1}
+    assert "Remote Part" in set(project.elements_names)
+
+
+def test_created_elements_get_the_server_ids(server):
+    server.assign_ids = True
+    project, client = new_project(server)
+
+    with project.transaction():
+        project.create_element("Wing", "Part 1")
+        project.add_attribute("mass", 120, "Wing")
+    project.update_element("Wing", "Left Wing")
+
+    server_elements = server.elements[project.current_commit]
+    assert set(project.element_index.by_id) == set(server_elements)
+    wing_id = project.element_index.ids_by_name("Left Wing")[0]
+    assert server_elements[wing_id]["name"] == "Left Wing"
+    assert project.element_index[project.element_index.ids_by_name("mass: 120")[0]]["owner_id"] == wing_id
+
+
+def test_transaction_edits_elements_created_in_it(server):
+    project, client = new_project(server)
+    client.request_counts.clear()
+
+    with project.transaction():
+        project.create_element("Wing", "Part 1")
+        project.update_element("Wing", "Left Wing")
+        project.add_attribute("mass", 120, "Left Wing")
+        project.update_attribute("mass: 120", 95)
+        project.create_requirement("Lift", "Lifts the aircraft", "Left Wing")
+        project.update_requirement("Lift", new_req_name="Lift Margin")
+
+    assert client.request_counts[("POST", "commits")] == 1
+    index = project.element_index
+    assert index.ids_by_name("Wing") == [] and index.ids_by_name("mass: 120") == [] and index.ids_by_name("Lift") == []
+    wing_id = index.ids_by_name("Left Wing")[0]
+    assert index[index.ids_by_name("mass: 95")[0]]["owner_id"] == wing_id
+    assert index[index.ids_by_name("Lift Margin")[0]]["desc"] == ["Lifts the aircraft"]
+
+
+def test_transaction_does_not_find_elements_renamed_or_deleted_in_it(server):
+    project, client = new_project(server)
+
+    with project.transaction():
+        project.update_element("Part 1", "Part 1 Renamed")
+        assert not project._name_exists("Part 1") and project._name_exists("Part 1 Renamed")
+        project.create_element("Strut", "Part 2")
+        project.delete_element("Strut")
+        assert not project._name_exists("Strut")
+
+    assert project.element_index.ids_by_name("Strut") == []
+
+
+def test_transaction_deletes_elements_created_under_the_deleted_part(server):
+    project, client = new_project(server)
+    part_ids = {project.element_index.ids_by_name("Part 2")[0]} | set(project.element_index.descendant_ids(project.element_index.ids_by_name("Part 2")[0]))
+
+    with project.transaction():
+        project.create_element("Wing", "Part 2")
+        project.add_attribute("mass", 120, "Wing")
+        result = project.delete_element("Part 2")
+        assert result["queued"] is True and result["commit"] is None
+        assert result["removed"] == len(part_ids) + 2
+
+    index = project.element_index
+    assert not part_ids & set(index.by_id)
+    assert index.ids_by_name("Wing") == [] and index.ids_by_name("mass: 120") == []
+    assert all(record["owner_id"] is None or record["owner_id"] in index for record in index.values())
+
+
+def test_transaction_posts_nothing_if_the_block_raises(server):
+    project, client = new_project(server)
+    commit_id = project.current_commit
+    client.request_counts.clear()
+
+    with pytest.raises(RuntimeError):
+        with project.transaction():
+            project.create_element("Wing", "Part 1")
+            raise RuntimeError
+
+    assert client.request_counts[("POST", "commits")] == 0
+    assert project.current_commit == commit_id and project._transaction is None
+
+
+def test_import_nests_rows_under_the_server_ids(server):
+    server.assign_ids = True
+    project, client = new_project(server)
+    table = io.StringIO("name,type,owner,value,description\nWing,Part,Part 1,,\nFlap,Part,Wing,,\nmass,Attribute,Flap,3,\n")
+
+    project.import_model(table, format="csv", progress=False)
+
+    server_elements = server.elements[project.current_commit]
+    assert set(project.element_index.by_id) == set(server_elements)
+    wing_id, flap_id = project.element_index.ids_by_name("Wing")[0], project.element_index.ids_by_name("Flap")[0]
+    assert server_elements[flap_id]["ownedElement"] == [{"@id": wing_id}] # an element lists its owner
+    assert project.element_index[flap_id]["owner_id"] == wing_id
+
+
+def test_import_skips_an_attribute_only_on_its_own_owner(server):
+    project, client = new_project(server)
+    project.add_attribute("material", "steel", "Part 2")
+    table = io.StringIO("name,type,owner,value,description\nmaterial,Attribute,Part 2,steel,\nmaterial,Attribute,Part 3,steel,\n")
+
+    result = project.import_model(table, format="csv", progress=False)
+
+    assert (result["imported"], result["skipped"]) == (1, 1)
+    owner_names = sorted(project.element_index[project.element_index[attribute_id]["owner_id"]]["name"]
+                         for attribute_id in project.element_index.ids_by_name("material: steel"))
+    assert owner_names == ["Part 2", "Part 3"]
+
+
+def test_query_error_does_not_turn_pushdown_off(server, monkeypatch):
+    project, client = new_project(server)
+    api._query_unsupported_hosts.discard(client.host)
+    responses = []
+    post = client.post
+
+    def failing_post(path, body=None, **kwargs):
+        response = post(path, body, **kwargs)
+        if responses:
+            response.status_code, response._content = responses.pop(0)
+        return response
+
+    monkeypatch.setattr(client, "post", failing_post)
+
+    responses.append((400, b'{"error": "Invalid constraint"}'))
+    parts = api.query_elements(project.id, project.current_commit, "PartUsage", client=client)
+    assert client.host not in api._query_unsupported_hosts
+    assert len(parts) == len(project.element_index.ids_by_type("PartUsage"))
+
+    responses.append((400, b'{"error": "Query is not supported"}'))
+    api.query_elements(project.id, project.current_commit, "PartUsage", client=client)
+    assert client.host in api._query_unsupported_hosts
+    api._query_unsupported_hosts.discard(client.host)
+
+
+def test_step_back_from_latest_commit_does_not_reload(server):
+    project, client = new_project(server)
+    for i in range(3):
+        project.create_element(f"Extra Part {i}", "Part 1")
+    project.update_element("Part 1", "Part 1 Renamed")
+
+    viewer = api.Project("Synthetic", client=client)
+    client.request_counts.clear()
+    viewer.select_commit(index=2) # commits are listed newest first
+
+    assert client.request_counts[("GET", "elements")] == 0
+    assert client.request_counts[("GET", "changes")] == 2
+    undone = {change["identity"]["@id"] for commit_id in viewer.all_commits["Commit ID"][:2] for change in server.changes[commit_id]}
+    assert client.request_counts[("GET", "elements/{id}")] == len(undone)
+    server_elements = server.elements[viewer.current_commit]
+    assert set(viewer.element_index.by_id) == set(server_elements)
+    assert {record["name"] for record in viewer.element_index.values()} == {element["name"] for element in server_elements.values()}
+
+
+def test_diff_of_latest_commit_reuses_the_loaded_model(server):
+    project, client = new_project(server)
+    project.update_element("Part 1", "Part 1 Renamed")
+
+    viewer = api.Project("Synthetic", client=client)
+    client.request_counts.clear()
+    diff = viewer.diff()
+
+    assert dict(client.request_counts) == {("GET", "changes"): 1, ("GET", "elements/{id}"): 1}
+    assert len(diff.renamed) == 1
+
+
+def test_export_root_by_id_or_unique_name(server):
+    project, client = new_project(server)
+    project.create_element("Bracket", "Part 1")
+    project.create_element("Bracket", "Part 2", repeat=True)
+    bracket_ids = project.element_index.ids_by_name("Bracket")
+
+    with pytest.raises(ValueError, match="2 elements are named Bracket"):
+        project.export(io.StringIO(), root="Bracket")
+
+    file = io.StringIO()
+    assert project.export(file, root=bracket_ids[1]) == 1
+    assert bracket_ids[1] in file.getvalue() and bracket_ids[0] not in file.getvalue()
+    assert project.export(io.StringIO(), root="Part 1") == 1 + len(project.element_index.descendant_ids(project.element_index.ids_by_name("Part 1")[0]))
+
+
+def test_requirements_of_an_unloaded_commit_are_queried_alone(server):
+    project, client = new_project(server)
+    old_commit = project.current_commit
+    project.create_requirement("Range", "Flies 500 km", "Part 1")
+    api._query_unsupported_hosts.discard(client.host)
+
+    viewer = api.Project("Synthetic", client=client)
+    client.request_counts.clear()
+    requirements = viewer.requirements_table(old_commit)
+
+    assert dict(client.request_counts) == {("POST", "query-results"): 1}
+    server_requirements = {element_id for element_id, element in server.elements[old_commit].items() if element["@type"] == "RequirementUsage"}
+    assert set(requirements["id"]) == server_requirements and len(server_requirements) > 0
+    assert list(requirements.columns) == list(viewer.all_reqs.columns)
+    assert "Range" in set(viewer.requirements_table()["name"]) and "Range" not in set(requirements["name"])
+
+
+def test_query_refuses_an_ambiguous_owner_name(server):
+    project, client = new_project(server)
+    project.create_element("Bracket", "Part 1")
+    project.create_element("Bracket", "Part 2", repeat=True)
+    project.create_element("Bolt", "Part 1")
+    bolt_id = project.element_index.ids_by_name("Bolt")[0]
+    project.update_element("Bolt", "Bolt", new_owner="Bracket") # the first Bracket
+    owner_id = project.element_index[bolt_id]["owner_id"]
+
+    for filters in [dict(owner="Bracket"), dict(ancestor="Bracket")]:
+        with pytest.raises(ValueError, match="2 elements are named Bracket"):
+            project.query(**filters)
+
+    assert project.query(owner=owner_id).ids == [bolt_id]
+    other_id = next(element_id for element_id in project.element_index.ids_by_name("Bracket") if element_id != owner_id)
+    assert project.query(ancestor=other_id).ids == []